@@ -0,0 +1,133 @@
+"""An in-memory stand-in for the parts of the Firestore client hr_dashboard.py uses.
+
+install() makes firebase_admin hand out the stand-in, so the app runs
+unchanged without credentials or network access.
+"""
+import collections
+import threading
+import time
+
+class Snapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+class DocumentReference:
+    def __init__(self, db, collection, doc_id):
+        self.db = db
+        self.collection = collection
+        self.id = doc_id
+
+    def get(self):
+        self.db.record("read")
+        with self.db.lock:
+            return Snapshot(self, self.db.data[self.collection].get(self.id))
+
+    def set(self, data):
+        self.db.record("write")
+        with self.db.lock:
+            self.db.data[self.collection][self.id] = dict(data)
+
+    def update(self, fields):
+        self.db.record("write")
+        with self.db.lock:
+            document = self.db.data[self.collection].get(self.id)
+            if document is None:
+                raise KeyError(f"No document to update: {self.collection}/{self.id}")
+            document.update(fields)
+
+    def delete(self):
+        self.db.record("delete")
+        with self.db.lock:
+            self.db.data[self.collection].pop(self.id, None)
+
+class Query:
+    OPERATORS = {
+        "==": lambda a, b: a == b,
+        "<": lambda a, b: a is not None and a < b,
+        "<=": lambda a, b: a is not None and a <= b,
+        ">": lambda a, b: a is not None and a > b,
+        ">=": lambda a, b: a is not None and a >= b,
+    }
+
+    def __init__(self, db, collection, filters=(), limit=None):
+        self.db = db
+        self.collection = collection
+        self.filters = tuple(filters)
+        self._limit = limit
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return Query(self.db, self.collection, self.filters + ((field_path, op_string, value),), self._limit)
+
+    def limit(self, count):
+        return Query(self.db, self.collection, self.filters, count)
+
+    def stream(self):
+        self.db.record("query")
+        with self.db.lock:
+            items = list(self.db.data[self.collection].items())
+        matches = [
+            Snapshot(DocumentReference(self.db, self.collection, doc_id), data)
+            for doc_id, data in items
+            if all(self.OPERATORS[op](data.get(field), value) for field, op, value in self.filters)
+        ]
+        return iter(matches[:self._limit] if self._limit else matches)
+
+class CollectionReference(Query):
+    def document(self, doc_id):
+        return DocumentReference(self.db, self.collection, doc_id)
+
+class WriteBatch:
+    def __init__(self, db):
+        self.db = db
+        self.deletes = []
+
+    def delete(self, reference):
+        self.deletes.append(reference)
+
+    def commit(self):
+        self.db.record("batch")
+        with self.db.lock:
+            for reference in self.deletes:
+                self.db.data[reference.collection].pop(reference.id, None)
+
+class FirestoreStub:
+    """Collections of plain dicts plus a counter of calls by kind.
+
+    Every call sleeps for latency seconds to stand in for the network round trip.
+    """
+
+    def __init__(self, latency=0.0):
+        self.data = collections.defaultdict(dict)
+        self.calls = collections.Counter()
+        self.lock = threading.Lock()
+        self.latency = latency
+
+    def record(self, kind):
+        with self.lock:
+            self.calls[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name):
+        return CollectionReference(self, name)
+
+    def batch(self):
+        return WriteBatch(self)
+
+def install(db=None):
+    """Routes firebase_admin to an in-memory database and returns it."""
+    import firebase_admin
+    from firebase_admin import firestore
+
+    db = db or FirestoreStub()
+    firebase_admin._apps.setdefault("[DEFAULT]", object())
+    firestore.client = lambda *args, **kwargs: db
+    return db
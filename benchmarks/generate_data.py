@@ -0,0 +1,121 @@
+"""Writes synthetic attendance exports shaped like the real HR export.
+
+Usage:
+    python benchmarks/generate_data.py --employees 500 --days 365 --output attendances.xlsx
+    python benchmarks/generate_data.py --employees 2000 --days 90 --output attendances.csv
+"""
+import argparse
+import csv
+import datetime
+import os
+import random
+
+import openpyxl
+
+FIRST_NAMES = ["สมชาย", "สมหญิง", "วิชัย", "สุดา", "ประเสริฐ", "กาญจนา", "อนันต์", "พรทิพย์", "ธีระ", "มาลี",
+               "สุรชัย", "นภา", "ชัยวัฒน์", "รัตนา", "บุญมี", "ศิริพร", "Somboon", "Napat"]
+LAST_NAMES = ["ใจดี", "รักงาน", "มั่นคง", "ศรีสุข", "ทองดี", "แก้วมณี", "บุญเรือง", "สุขสวัสดิ์", "พึ่งบุญ", "Test"]
+DEPARTMENTS = ["บัญชี", "ไอที", "ฝ่ายผลิต", "คลังสินค้า", "ทรัพยากรบุคคล", "ขาย"]
+# Exception values as they appear in the export, with rough daily frequencies.
+EXCEPTIONS = {
+    None: 0.80,
+    "สาย": 0.06,
+    "ลาป่วย": 0.03,
+    "ลากิจ": 0.02,
+    "ลาป่วยครึ่งวัน": 0.01,
+    "ลากิจครึ่งวัน": 0.01,
+    "ขาด": 0.015,
+    "ขาดครึ่งวัน": 0.005,
+    "พักผ่อน": 0.04,
+}
+# Days without a clock-in/out record, shown as "-" in the export.
+NO_CLOCK = {"ขาด", "ลาป่วย", "ลากิจ", "พักผ่อน"}
+COLUMNS = ["วันที่", "รหัส", "ชื่อ-สกุล", "แผนก", "ข้อยกเว้น", "เข้างาน", "ออกงาน", "หมายเหตุ"]
+
+def messy(name, rng):
+    """Adds the stray spaces HR exports tend to have around and inside names."""
+    choice = rng.random()
+    if choice < 0.1:
+        return f" {name}"
+    if choice < 0.2:
+        return f"{name} "
+    if choice < 0.25:
+        return name.replace(" ", "  ")
+    return name
+
+def make_employees(count, rng):
+    """Returns (id, name, department) for count employees with unique names."""
+    employees = []
+    for i in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i + 1:05d}"
+        employees.append((f"E{i + 1:05d}", name, rng.choice(DEPARTMENTS)))
+    return employees
+
+def iter_rows(employees, days, start, rng):
+    """Yields export rows day by day, as the HR system writes them."""
+    exceptions, weights = list(EXCEPTIONS), list(EXCEPTIONS.values())
+    for day in range(days):
+        date = start + datetime.timedelta(days=day)
+        for employee_id, name, department in employees:
+            exception = rng.choices(exceptions, weights)[0]
+            if exception in NO_CLOCK:
+                check_in = check_out = "-"
+            else:
+                late = exception == "สาย"
+                check_in = f"{rng.randint(8, 9) if late else 7:02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+                # A few days have no clock-out scan.
+                check_out = "-" if rng.random() < 0.01 else f"{rng.randint(16, 19):02d}:{rng.randint(0, 59):02d}:00"
+            yield [
+                datetime.datetime.combine(date, datetime.time()),
+                employee_id,
+                messy(name, rng),
+                department if rng.random() > 0.01 else None,
+                exception,
+                check_in,
+                check_out,
+                None,
+            ]
+
+def write_xlsx(path, rows):
+    """Streams rows into a single-sheet workbook without holding it in memory."""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+def write_csv(path, rows):
+    """Writes rows as UTF-8 CSV with ISO dates."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            row[0] = row[0].date().isoformat()
+            writer.writerow(row)
+
+def generate(path, employees=200, days=365, start=datetime.date(2025, 1, 1), seed=0):
+    """Writes a synthetic export to path (.xlsx or .csv) and returns its row count."""
+    rng = random.Random(seed)
+    staff = make_employees(employees, rng)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    rows = iter_rows(staff, days, start, rng)
+    if path.lower().endswith(".csv"):
+        write_csv(path, rows)
+    else:
+        write_xlsx(path, rows)
+    return employees * days
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic attendance export.")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--start", type=datetime.date.fromisoformat, default=datetime.date(2025, 1, 1))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="attendances.xlsx", help="output path ending in .xlsx or .csv")
+    args = parser.parse_args(argv)
+    rows = generate(args.output, args.employees, args.days, args.start, args.seed)
+    print(f"Wrote {rows} rows to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Drives concurrent simulated logins through the real app against an in-memory Firestore.
+
+Each simulated employee opens the login page, signs in (user lookup, bcrypt
+check, session creation, dashboard render) and then reloads the page with
+the session cookie (session check, dashboard render), the way employees do
+at shift start. With --cold-reload the reload presents a session the app has
+not cached, as when it lands on another replica, so the session check reads
+Firestore.
+
+Usage:
+    python benchmarks/load_test.py --users 200 --concurrency 20 --latency-ms 30
+    python benchmarks/load_test.py --users 200 --concurrency 20 --cold-reload
+"""
+import argparse
+import concurrent.futures
+import os
+import sys
+import threading
+import time
+import uuid
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import firestore_stub
+from run_benchmarks import APP_PATH, prepare
+
+# Session state key holding the cookie a simulated browser sends on reload.
+COOKIE_STATE_KEY = "_load_test_cookie"
+
+def simulate_cookies():
+    """Makes st.context.cookies return each simulated browser's own session cookie."""
+    import streamlit as st
+    from streamlit.runtime.context import ContextProxy
+    import hr_dashboard as hr
+
+    def cookies(self):
+        session_id = st.session_state.get(COOKIE_STATE_KEY)
+        return {hr.SESSION_COOKIE: session_id} if session_id else {}
+
+    ContextProxy.cookies = property(cookies)
+
+def allow_parallel_apptests():
+    """Lets AppTest instances run in parallel threads.
+
+    AppTest installs a mock Runtime singleton for each run and clears it when the
+    run ends, which would pull it out from under runs still going in other
+    threads, so the last installed one keeps being handed out. Script compiles
+    are serialized because CPython's AST construction is not thread-safe.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    last = {}
+    def instance(cls):
+        if cls._instance is not None:
+            last["runtime"] = cls._instance
+        if "runtime" not in last:
+            raise RuntimeError("Runtime hasn't been created!")
+        return last["runtime"]
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "runtime" in last)
+
+    compile_lock = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+    def locked_get_bytecode(self, script_path):
+        with compile_lock:
+            return get_bytecode(self, script_path)
+    ScriptCache.get_bytecode = locked_get_bytecode
+
+def seed_users(db, hr, count, rounds):
+    """Creates count users named after employees in the data, all with password "load-test"."""
+    import bcrypt
+
+    names = hr.read_attendance(os.environ["HR_DASHBOARD_DATA"]).summary["ชื่อ-สกุล"].tolist()
+    # One hash is enough: checking it costs the same for every user.
+    hashed = bcrypt.hashpw(b"load-test", bcrypt.gensalt(rounds)).decode()
+    users = []
+    for i in range(count):
+        phone = f"08{i:08d}"
+        db.data["users"][phone] = {"name": names[i % len(names)], "password": hashed}
+        users.append(phone)
+    return users
+
+def uncached_session(db, session_id):
+    """Copies a stored session under a new ID, which no session cache has seen yet."""
+    copy_id = str(uuid.uuid4())
+    with db.lock:
+        db.data["sessions"][copy_id] = dict(db.data["sessions"][session_id])
+    return copy_id
+
+def simulate_user(db, phone, timeout, cold_reload=False):
+    """Logs one user in and reloads the dashboard; returns (login seconds, reload seconds)."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    app.run()
+    app.text_input[0].input(phone)
+    app.text_input[1].input("load-test")
+    start = time.perf_counter()
+    app.button[0].click().run()
+    login = time.perf_counter() - start
+    if app.exception or app.session_state.step != "dashboard":
+        raise RuntimeError(f"login failed for {phone}: {app.exception or app.error}")
+
+    session_id = app.session_state.session_id
+    if cold_reload:
+        session_id = uncached_session(db, session_id)
+    reload = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    reload.session_state[COOKIE_STATE_KEY] = session_id
+    start = time.perf_counter()
+    reload.run()
+    restored = time.perf_counter() - start
+    if reload.exception or reload.session_state.step != "dashboard":
+        raise RuntimeError(f"session restore failed for {phone}: {reload.exception}")
+    return login, restored
+
+def percentiles(values):
+    if not values:
+        return "n/a"
+    p50, p95, p99 = (np.percentile(values, q) * 1000 for q in (50, 95, 99))
+    return f"p50 {p50:8.1f} ms   p95 {p95:8.1f} ms   p99 {p99:8.1f} ms"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent login load test for the HR dashboard.")
+    parser.add_argument("--users", type=int, default=50, help="simulated employees")
+    parser.add_argument("--concurrency", type=int, default=10, help="employees logging in at the same time")
+    parser.add_argument("--latency-ms", type=float, default=20, help="simulated Firestore round trip")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="cost of the stored password hashes")
+    parser.add_argument("--cold-reload", action="store_true",
+                        help="reload with a session the app has not cached, as on another replica")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=300, help="AppTest timeout per run in seconds")
+    parser.add_argument("--workdir", help="where generated data and caches are kept")
+    args = parser.parse_args(argv)
+
+    prepare(args)
+    os.environ["HR_DASHBOARD_BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    db = firestore_stub.install(firestore_stub.FirestoreStub())
+    import hr_dashboard as hr
+
+    simulate_cookies()
+    allow_parallel_apptests()
+    # One extra user, outside the test set, warms the caches so that none of
+    # the simulated users starts out cached.
+    *users, warm_phone = seed_users(db, hr, args.users + 1, args.bcrypt_rounds)
+    # Warm the shared data cache once, as a running server would have it.
+    from streamlit.testing.v1 import AppTest
+    warm = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    warm.session_state["user"] = db.data["users"][warm_phone]["name"]
+    warm.session_state["phone"] = warm_phone
+    warm.session_state["step"] = "dashboard"
+    warm.session_state["session_restore_done"] = True
+    warm.run()
+    # A reload with an unknown session starts the app's session sweeper; its
+    # first pass is waited out so that its query is not counted against the logins.
+    probe = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    probe.session_state[COOKIE_STATE_KEY] = "warm-up"
+    probe.run()
+    while not db.calls["query"]:
+        time.sleep(0.01)
+    db.calls.clear()
+    db.latency = args.latency_ms / 1000
+
+    logins, reloads, errors = [], [], []
+    lock = threading.Lock()
+    def run_one(phone):
+        try:
+            login, restored = simulate_user(db, phone, args.timeout, args.cold_reload)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+            return
+        with lock:
+            logins.append(login)
+            reloads.append(restored)
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(run_one, users))
+    elapsed = time.perf_counter() - start
+
+    completed = len(logins)
+    print(f"{args.users} users, {args.concurrency} concurrent, {args.latency_ms:g} ms Firestore latency, "
+          f"bcrypt cost {args.bcrypt_rounds}, {'cold' if args.cold_reload else 'warm'} reload")
+    print(f"completed {completed}, failed {len(errors)} in {elapsed:.1f} s "
+          f"({completed / elapsed:.2f} logins/s)")
+    print(f"login + dashboard : {percentiles(logins)}")
+    print(f"reload (session)  : {percentiles(reloads)}")
+    if completed:
+        per_login = ", ".join(f"{kind} {count / completed:.2f}" for kind, count in sorted(db.calls.items()))
+        print(f"Firestore calls per login: {per_login} (total {sum(db.calls.values()) / completed:.2f})")
+    for error in errors[:5]:
+        print(f"error: {error}")
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
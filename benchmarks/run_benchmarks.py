@@ -0,0 +1,152 @@
+"""Times the attendance data path and dashboard rendering on synthetic data.
+
+Usage:
+    python benchmarks/run_benchmarks.py --employees 500 --days 365
+    python benchmarks/run_benchmarks.py --save-baseline   # store results in benchmarks/baselines/
+    python benchmarks/run_benchmarks.py --compare         # compare against the stored baseline
+
+Firestore is replaced by benchmarks/firestore_stub.py, so no credentials are needed.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+APP_PATH = os.path.join(ROOT, "hr_dashboard.py")
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+sys.path[:0] = [ROOT, BENCH_DIR]
+
+import firestore_stub
+import generate_data
+
+def measure(fn, repeat):
+    """Returns fn's wall times in seconds over repeat calls and the peak traced memory of one more call."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    # Tracing slows allocation-heavy code, so memory is measured on a separate call.
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+def summarize(times, peak):
+    """Reduces raw timings to the numbers kept in reports and baselines."""
+    return {
+        "runs": len(times),
+        "p50_ms": round(float(np.percentile(times, 50)) * 1000, 2),
+        "p95_ms": round(float(np.percentile(times, 95)) * 1000, 2),
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+def prepare(args):
+    """Generates (or reuses) the synthetic export and points the app's environment at it."""
+    workdir = args.workdir or os.path.join(tempfile.gettempdir(), "hr_dashboard_bench")
+    data_path = os.path.join(workdir, f"attendances_{args.employees}x{args.days}.{args.format}")
+    if not os.path.exists(data_path):
+        print(f"Generating {args.employees} employees x {args.days} days -> {data_path}")
+        generate_data.generate(data_path, args.employees, args.days, seed=args.seed)
+    os.environ["HR_DASHBOARD_DATA"] = data_path
+    os.environ["HR_DASHBOARD_CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["HR_DASHBOARD_MATERIALIZED"] = os.path.join(workdir, "summary")
+    os.environ["HR_DASHBOARD_STORAGE"] = "firestore"
+    os.environ.setdefault("HR_DASHBOARD_BCRYPT_ROUNDS", "4")
+    return data_path
+
+def run(args):
+    """Runs every benchmark and returns {name: summary}."""
+    data_path = prepare(args)
+    db = firestore_stub.install()
+    import hr_dashboard as hr
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    times, peak = measure(lambda: hr.read_source_file(data_path), args.parse_repeat)
+    results["parse"] = summarize(times, peak)
+
+    # Warm the sidecar, then time the path every app process takes after the first.
+    hr.read_attendance(data_path, materialized_dir=None)
+    times, peak = measure(lambda: hr.read_attendance(data_path, materialized_dir=None), args.repeat)
+    results["load_sidecar"] = summarize(times, peak)
+
+    data = hr.read_attendance(data_path, materialized_dir=None)
+    names = data.summary["ชื่อ-สกุล"].tolist()
+    rng = random.Random(args.seed)
+    sample = [rng.choice(names) for _ in range(args.repeat)]
+    users = iter(sample * 2)
+    times, peak = measure(lambda: hr.process_user_data(data, next(users)), args.repeat)
+    results["process_user_data"] = summarize(times, peak)
+
+    phone = "0800000000"
+    db.data["users"][phone] = {"name": sample[0], "password": hr.hash_password("bench")}
+    app = AppTest.from_file(APP_PATH, default_timeout=args.timeout)
+    app.session_state["user"] = sample[0]
+    app.session_state["phone"] = phone
+    app.session_state["step"] = "dashboard"
+    app.session_state["session_restore_done"] = True
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"Dashboard failed to render: {app.exception}")
+    times, peak = measure(app.run, args.repeat)
+    results["render_dashboard"] = summarize(times, peak)
+    return results
+
+def baseline_path(args):
+    return os.path.join(BASELINE_DIR, f"{args.employees}x{args.days}_{args.format}.json")
+
+def report(results, baseline=None):
+    """Prints one line per benchmark, with the change against a baseline when given."""
+    print(f"{'benchmark':<20}{'runs':>6}{'p50 ms':>12}{'p95 ms':>12}{'peak MB':>10}")
+    for name, result in results.items():
+        line = f"{name:<20}{result['runs']:>6}{result['p50_ms']:>12.2f}{result['p95_ms']:>12.2f}{result['peak_mb']:>10.2f}"
+        previous = (baseline or {}).get(name)
+        if previous and previous["p50_ms"]:
+            change = (result["p50_ms"] - previous["p50_ms"]) / previous["p50_ms"] * 100
+            line += f"   p50 {change:+.1f}% vs baseline"
+        print(line)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the HR dashboard data path.")
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--format", choices=["xlsx", "csv"], default="xlsx")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per fast benchmark")
+    parser.add_argument("--parse-repeat", type=int, default=3, help="runs of the full parse")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120, help="AppTest timeout per run in seconds")
+    parser.add_argument("--workdir", help="where generated data and caches are kept")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    baseline = None
+    if args.compare:
+        try:
+            with open(baseline_path(args), encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        except FileNotFoundError:
+            print(f"No baseline at {baseline_path(args)}; run with --save-baseline first.")
+    report(results, baseline)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        params = {"employees": args.employees, "days": args.days, "format": args.format, "seed": args.seed}
+        with open(baseline_path(args), "w", encoding="utf-8") as f:
+            json.dump({"params": params, "results": results}, f, indent=2)
+        print(f"Saved baseline to {baseline_path(args)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Measures time to first paint of the login page in cold processes.
+
+Each sample starts a fresh Python process that imports Streamlit and renders
+the login page once through AppTest, as the first visitor after a deploy or
+restart would trigger it. The parent reports the process wall time, the
+script run itself and which heavy modules that first page loaded.
+
+Usage:
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(os.path.dirname(BENCH_DIR), "hr_dashboard.py")
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "altair", "openpyxl", "firebase_admin", "bcrypt"]
+
+def child():
+    """Renders the login page once and prints timings as JSON."""
+    start = time.perf_counter()
+    from streamlit.runtime.context import ContextProxy
+    from streamlit.testing.v1 import AppTest
+
+    # AppTest's mock runtime has no real request; present a browser without cookies.
+    ContextProxy.cookies = property(lambda self: {})
+    imported = time.perf_counter()
+    app = AppTest.from_file(APP_PATH, default_timeout=120)
+    app.run()
+    done = time.perf_counter()
+    if app.exception or not app.text_input:
+        raise SystemExit(f"login page did not render: {app.exception}")
+    print(json.dumps({
+        "import_s": imported - start,
+        "script_s": done - imported,
+        "loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for the login page.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child()
+        return
+
+    env = dict(os.environ, HR_DASHBOARD_STORAGE="sqlite",
+               HR_DASHBOARD_SQLITE_PATH=os.path.join(tempfile.gettempdir(), "hr_dashboard_startup.db"))
+    walls, scripts, loaded = [], [], set()
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, __file__, "--child"], env=env, cwd=tempfile.gettempdir(),
+            capture_output=True, text=True, check=True,
+        ).stdout
+        walls.append(time.perf_counter() - start)
+        result = json.loads(output.strip().splitlines()[-1])
+        scripts.append(result["script_s"])
+        loaded.update(result["loaded"])
+
+    def line(values):
+        return f"p50 {np.percentile(values, 50) * 1000:8.1f} ms   p95 {np.percentile(values, 95) * 1000:8.1f} ms"
+    print(f"{args.runs} cold starts of the login page")
+    print(f"process start to first paint : {line(walls)}")
+    print(f"login page script run        : {line(scripts)}")
+    print(f"heavy modules loaded         : {', '.join(sorted(loaded)) or 'none'}")
+
+if __name__ == "__main__":
+    main()
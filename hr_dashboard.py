@@ -1,35 +1,264 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import pandas as pd
-import altair as alt
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import importlib
 import datetime
+import hashlib
+from dataclasses import dataclass, field
 import os
+import re
+import sys
+import abc
+import argparse
+import atexit
 import pytz
 import json
-import firebase_admin
-from firebase_admin import credentials, firestore
-import bcrypt
+import logging
+import contextlib
+import sqlite3
 import uuid
 import time
+import threading
+import functools
+import http.server
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows: sidecar ingestion is not coordinated between processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class LazyModule:
+    """Imports a module on first attribute access, so pages that never use it don't pay for it."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        setattr(self, attr, value)
+        return value
+
+# The login page needs none of these; they load on the first page that does.
+# Firebase is imported by FirestoreBackend when the storage resource is created.
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+alt = LazyModule("altair")
+pa = LazyModule("pyarrow")
+feather = LazyModule("pyarrow.feather")
+openpyxl = LazyModule("openpyxl")
+bcrypt = LazyModule("bcrypt")
 
 # -----------------------------
 # Page Setup and Styling
 # -----------------------------
-st.set_page_config(
-    page_title="เช็ค ขาด ลา สาย",
-    page_icon="⏰",
-    layout="wide"
-)
+def setup_page():
+    """Configures the page and hides the default Streamlit UI."""
+    st.set_page_config(
+        page_title="เช็ค ขาด ลา สาย",
+        page_icon="⏰",
+        layout="wide"
+    )
+
+    # Hide default Streamlit UI
+    hide_streamlit_style = """
+                <style>
+                #MainMenu {visibility: hidden;}
+                footer {visibility: hidden;}
+                header {visibility: hidden;}
+                </style>
+                """
+    st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+
+# -----------------------------
+# Metrics
+# -----------------------------
+# Spans and counters are aggregated per process and exported in the Prometheus
+# text format: to HR_DASHBOARD_METRICS_FILE (rewritten at most every
+# METRICS_FILE_INTERVAL seconds) and/or at http://127.0.0.1:<HR_DASHBOARD_METRICS_PORT>/metrics.
+# Every series carries a pid label and each process writes its own file
+# (hr_dashboard.prom -> hr_dashboard.<pid>.prom), so replicas on one host
+# don't overwrite each other's counters. Only one of them can bind the port.
+METRICS_FILE = os.environ.get("HR_DASHBOARD_METRICS_FILE")
+METRICS_PORT = os.environ.get("HR_DASHBOARD_METRICS_PORT")
+METRICS_FILE_INTERVAL = 15
+SPAN_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Metrics:
+    """Thread-safe span histograms and counters for one app process."""
+
+    def __init__(self, buckets=SPAN_BUCKETS):
+        self.buckets = buckets
+        self.pid = os.getpid()
+        self.spans = {}
+        self.counters = {}
+        self.collectors = []
+        self.last_file_write = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, span, seconds):
+        """Records one duration in the span's histogram."""
+        with self._lock:
+            entry = self.spans.setdefault(span, {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0, "max": 0.0})
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry["buckets"][i] += 1
+                    break
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """Times the enclosed block, including blocks left by st.rerun() or st.stop()."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def inc(self, name, amount=1, **labels):
+        """Adds to a counter, e.g. inc("storage_reads_total", backend="firestore")."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def add_collector(self, collect):
+        """Registers a callable returning {(name, labels): value} for counters kept elsewhere."""
+        with self._lock:
+            self.collectors.append(collect)
+
+    def counter_values(self):
+        """Returns all counters, including those reported by collectors."""
+        with self._lock:
+            values = dict(self.counters)
+            collectors = list(self.collectors)
+        for collect in collectors:
+            values.update(collect())
+        return values
+
+    def span_rows(self):
+        """Returns one summary row per span for the debug panel."""
+        with self._lock:
+            return [
+                {"span": name, "count": e["count"], "total (s)": round(e["sum"], 3),
+                 "mean (ms)": round(e["sum"] / e["count"] * 1000, 1), "max (ms)": round(e["max"] * 1000, 1)}
+                for name, e in sorted(self.spans.items())
+            ]
+
+    def render_prometheus(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = [
+            "# HELP hr_dashboard_span_seconds Time spent in instrumented operations.",
+            "# TYPE hr_dashboard_span_seconds histogram",
+        ]
+        with self._lock:
+            spans = {name: dict(e, buckets=list(e["buckets"])) for name, e in sorted(self.spans.items())}
+        for name, e in spans.items():
+            span_labels = f'span="{name}",pid="{self.pid}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, e["buckets"]):
+                cumulative += count
+                lines.append(f'hr_dashboard_span_seconds_bucket{{{span_labels},le="{bound}"}} {cumulative}')
+            lines.append(f'hr_dashboard_span_seconds_bucket{{{span_labels},le="+Inf"}} {e["count"]}')
+            lines.append(f'hr_dashboard_span_seconds_sum{{{span_labels}}} {e["sum"]:.6f}')
+            lines.append(f'hr_dashboard_span_seconds_count{{{span_labels}}} {e["count"]}')
+        typed = set()
+        for (name, labels), value in sorted(self.counter_values().items()):
+            if name not in typed:
+                lines.append(f"# TYPE hr_dashboard_{name} counter")
+                typed.add(name)
+            label_text = ",".join(f'{k}="{v}"' for k, v in (*labels, ("pid", self.pid)))
+            lines.append(f"hr_dashboard_{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def file_path(self, path):
+        """Returns this process's own metrics file next to path, e.g. hr_dashboard.1234.prom."""
+        root, ext = os.path.splitext(path)
+        return f"{root}.{self.pid}{ext}"
 
-# Hide default Streamlit UI
-hide_streamlit_style = """
-            <style>
-            #MainMenu {visibility: hidden;}
-            footer {visibility: hidden;}
-            header {visibility: hidden;}
-            </style>
-            """
-st.markdown(hide_streamlit_style, unsafe_allow_html=True)
+    def write_file(self, path, min_interval=METRICS_FILE_INTERVAL):
+        """Atomically rewrites this process's metrics file unless it was written within min_interval seconds."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self.last_file_write < min_interval:
+                return
+            first_write = not self.last_file_write
+            self.last_file_write = now
+        path = self.file_path(path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+        if first_write:
+            # A stopped process's counters would otherwise be scraped forever.
+            atexit.register(remove_file, path)
+
+def remove_file(path):
+    """Deletes a file if it still exists."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+
+@st.cache_resource
+def get_metrics():
+    """Returns the process-wide metrics registry."""
+    return Metrics()
+
+def timed(span):
+    """Decorates a function so each call is recorded under the given span name."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().span(span):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+@st.cache_resource
+def start_metrics_server(port):
+    """Serves /metrics on localhost from a daemon thread; started once per process.
+
+    Returns None if the port is taken, e.g. by another replica on the host. The
+    None is cached too, so the bind is not retried on every script run.
+    """
+    metrics = get_metrics()
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    except OSError as e:
+        logger.warning("Metrics endpoint not started on port %d: %s", port, e)
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+def export_metrics():
+    """Publishes metrics to the configured file and endpoint."""
+    try:
+        if METRICS_PORT:
+            start_metrics_server(int(METRICS_PORT))
+        if METRICS_FILE:
+            get_metrics().write_file(METRICS_FILE)
+    except Exception:
+        # Metrics must never break the dashboard.
+        logger.exception("Exporting metrics failed")
 
 # -----------------------------
 # Timezone and Date Functions
@@ -42,159 +271,954 @@ def thai_date(dt):
         return "N/A"
     return dt.strftime(f"%d/%m/{dt.year + 543}")
 
-def format_time(dt):
-    """Converts a datetime object to a time string (HH:MM)."""
-    if pd.isna(dt) or (isinstance(dt, datetime.time) and dt == datetime.time(0, 0)):
-        return "00:00"
-    return dt.strftime("%H:%M")
+def thai_dates(dates):
+    """Vectorized thai_date for a Series of datetimes."""
+    years = (dates.dt.year.fillna(0).astype(int) + 543).astype(str)
+    return (dates.dt.strftime("%d/%m/") + years).where(dates.notna(), "N/A")
+
+def format_times(minutes):
+    """Formats a Series of minutes since midnight as HH:MM; missing times (-1) show as 00:00."""
+    values = np.maximum(minutes.to_numpy(), 0)
+    hours = pd.Series(values // 60, index=minutes.index).astype(str).str.zfill(2)
+    mins = pd.Series(values % 60, index=minutes.index).astype(str).str.zfill(2)
+    return hours + ":" + mins
 
 # -----------------------------
 # Data Handling
 # -----------------------------
-@st.cache_data(ttl=600)
-def load_data(file_path="attendances.xlsx", file_mod_time=None):
-    """Loads data from an Excel or CSV file and returns a DataFrame.
-    
-    The 'file_mod_time' argument is a cache bust key to reload data when the file changes.
+# HR_DASHBOARD_DATA is either one export file or a directory of period files
+# (e.g. attendances_2026-10.xlsx), each parsed and cached on its own.
+DATA_PATH = os.environ.get("HR_DASHBOARD_DATA", "attendances.xlsx")
+SOURCE_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+# Only these columns are read from the exports; everything else is skipped while streaming.
+USED_COLUMNS = ['วันที่', 'ชื่อ-สกุล', 'แผนก', 'ข้อยกเว้น', 'เข้างาน', 'ออกงาน']
+READ_CHUNK_ROWS = 50_000
+
+# Parsed attendance data is kept in columnar Arrow IPC sidecars keyed by a hash
+# of the source contents. By default they live in .hr_cache next to the source;
+# point HR_DASHBOARD_CACHE_DIR at a shared directory so that several app
+# processes ingest once and memory-map the same files. Bump the schema version
+# whenever the cleaning below changes so stale sidecars are ignored.
+SIDECAR_DIR = ".hr_cache"
+SHARED_CACHE_DIR = os.environ.get("HR_DASHBOARD_CACHE_DIR")
+SIDECAR_SCHEMA_VERSION = 7
+SIDECAR_STAMP_KEY = b"hr_dashboard.version"
+NAME_KEY = "ชื่อ-สกุล_normalized"
+# `python hr_dashboard.py ingest` precomputes per-employee totals and exception
+# rows into HR_DASHBOARD_MATERIALIZED. The dashboard reads them instead of the
+# full export as long as the manifest's source digest still matches.
+MATERIALIZED_PATH = os.environ.get("HR_DASHBOARD_MATERIALIZED", "attendance_summary")
+MATERIALIZED_VERSION = 4
+# Clock-in/out times are int16 minutes since midnight; MISSING_TIME marks "-" or blank.
+MISSING_TIME = -1
+
+# Exception values counted under each leave type on the dashboard.
+LEAVE_TYPES_MAP = {
+    "ลาป่วย/ลากิจ": ["ลาป่วย", "ลากิจ", "ลาป่วยครึ่งวัน", "ลากิจครึ่งวัน"],
+    "ขาด": ["ขาด", "ขาดครึ่งวัน"],
+    "สาย": ["สาย"],
+    "พักผ่อน": ["พักผ่อน"]
+}
+LEAVE_TYPES = list(LEAVE_TYPES_MAP)
+
+def build_exception_weights():
+    """Builds the lookup table of leave counts per exception value (half days count 0.5)."""
+    weights = pd.DataFrame(0.0, index=[e for exceptions in LEAVE_TYPES_MAP.values() for e in exceptions], columns=LEAVE_TYPES)
+    for leave_type, exceptions in LEAVE_TYPES_MAP.items():
+        for exception in exceptions:
+            weights.loc[exception, leave_type] = 0.5 if "ครึ่งวัน" in exception else 1
+    return weights
+
+def normalize_name(name):
+    """Normalizes an employee name for matching (whitespace and case), as clean_attendance does."""
+    return " ".join(str(name).split()).lower()
+
+def classify_exceptions(df):
+    """Adds a leave-count column per leave type from the categorical exception column."""
+    exceptions = df['ข้อยกเว้น'].astype('category')
+    df['ข้อยกเว้น'] = exceptions
+    weights = build_exception_weights().reindex(exceptions.cat.categories, fill_value=0.0).to_numpy()
+    # Missing values have code -1, which picks the trailing all-zero row.
+    weights = np.vstack([weights, np.zeros(len(LEAVE_TYPES))])
+    counts = weights[exceptions.cat.codes.to_numpy()]
+    # Half days only occur in the first two types; the others are whole counts.
+    for i, leave_type in enumerate(LEAVE_TYPES):
+        df[leave_type] = counts[:, i].astype('float32' if leave_type in ["ลาป่วย/ลากิจ", "ขาด"] else 'int8')
+    return df
+
+def parse_clock_minutes(values):
+    """Parses clock times ("HH:MM:SS" strings or datetime.time) into int16 minutes since midnight."""
+    parsed = pd.to_datetime(values.replace('-', None).astype(str), format='%H:%M:%S', errors='coerce')
+    minutes = parsed.dt.hour * 60 + parsed.dt.minute
+    return minutes.fillna(MISSING_TIME).astype('int16')
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def sidecar_path(file_path, digest):
+    """Returns the sidecar location for a source file (or directory) with the given digest."""
+    file_path = os.path.normpath(file_path)
+    cache_dir = SHARED_CACHE_DIR or os.path.join(os.path.dirname(file_path) or ".", SIDECAR_DIR)
+    file_name = f"{os.path.basename(file_path)}.{digest[:16]}.v{SIDECAR_SCHEMA_VERSION}.arrow"
+    return os.path.join(cache_dir, file_name)
+
+def sidecar_stamp(digest):
+    """Returns the version stamp stored in a sidecar's schema metadata."""
+    return f"{digest}:{SIDECAR_SCHEMA_VERSION}".encode()
+
+def read_sidecar(path, digest):
+    """Memory-maps a sidecar and returns it as a DataFrame, or None if it is missing or stale.
+
+    Numeric columns, and string columns under pandas 3's Arrow-backed str dtype,
+    stay backed by the read-only mapping, so processes that attach to the same
+    file share its pages instead of holding copies.
     """
-    file_extension = os.path.splitext(file_path)[1].lower()
-    
-    if not os.path.exists(file_path):
-        st.warning(f"❌ Data file not found: {file_path}")
-        return pd.DataFrame()
+    if not os.path.exists(path):
+        return None
+    try:
+        table = feather.read_table(path, memory_map=True)
+        if (table.schema.metadata or {}).get(SIDECAR_STAMP_KEY) != sidecar_stamp(digest):
+            return None
+        return table.to_pandas(split_blocks=True)
+    except Exception:
+        return None
 
+def write_sidecar(df, path, digest):
+    """Atomically writes a stamped sidecar and removes older ones for the same source."""
+    cache_dir, file_name = os.path.split(path)
+    source_name = file_name.rsplit(".", 3)[0]
+    tmp_path = f"{path}.{os.getpid()}.tmp"
     try:
-        if file_extension in ['.xlsx', '.xls']:
-            df = pd.read_excel(file_path, engine='openpyxl')
-        elif file_extension == '.csv':
-            df = pd.read_csv(file_path)
-        else:
-            st.error(f"Unsupported file format: {file_extension}")
-            return pd.DataFrame()
-        
-        # Data cleaning and type conversion
-        if 'วันที่' in df.columns:
-            df['วันที่'] = pd.to_datetime(df['วันที่'], errors='coerce')
-        if 'เข้างาน' in df.columns:
-            df['เข้างาน'] = df['เข้างาน'].replace('-', None)
-            df['เข้างาน'] = pd.to_datetime(df['เข้างาน'], format='%H:%M:%S', errors='coerce').dt.time
-        if 'ออกงาน' in df.columns:
-            df['ออกงาน'] = df['ออกงาน'].replace('-', None)
-            df['ออกงาน'] = pd.to_datetime(df['ออกงาน'], format='%H:%M:%S', errors='coerce').dt.time
+        os.makedirs(cache_dir, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), SIDECAR_STAMP_KEY: sidecar_stamp(digest)})
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        # Readers only ever see a missing or a complete file.
+        os.replace(tmp_path, path)
+    except Exception:
+        # The sidecar is only an accelerator; Excel stays the source of truth.
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        return
+    old_version = re.compile(re.escape(source_name) + r"\.[0-9a-f]{16}\.v\d+\.arrow(\.lock)?")
+    for name in os.listdir(cache_dir):
+        if old_version.fullmatch(name) and not name.startswith(file_name):
+            # Processes still mapping an old version keep it until they unmap it (POSIX).
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(cache_dir, name))
+
+@contextlib.contextmanager
+def ingest_lock(path):
+    """Holds an exclusive cross-process lock while one process builds a sidecar."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
+def load_cached(path, digest, build):
+    """Returns the sidecar at path, building and publishing it first if needed.
+
+    Only one process builds a given sidecar; the others wait on the lock and
+    then attach to the file it wrote.
+    """
+    df = read_sidecar(path, digest)
+    if df is not None:
         return df
-    except Exception as e:
-        st.error(f"Error reading file: {e}")
+    try:
+        with ingest_lock(path):
+            df = read_sidecar(path, digest)
+            if df is None:
+                df = build()
+                write_sidecar(df, path, digest)
+                # Swap the freshly parsed copy for the shared mapping.
+                mapped = read_sidecar(path, digest)
+                if mapped is not None:
+                    df = mapped
+    except OSError:
+        # Cache directory not writable: parse without sharing.
+        df = build()
+    return df
+
+def iter_excel_chunks(file_path, chunk_rows=READ_CHUNK_ROWS):
+    """Streams the used columns of the first worksheet as DataFrames of up to chunk_rows rows.
+
+    The workbook is opened in openpyxl read-only mode, so rows are parsed lazily
+    and never held in memory as a whole workbook.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        positions = {name: i for i, name in enumerate(header) if name in USED_COLUMNS}
+        columns = list(positions)
+        chunk = []
+        for row in rows:
+            values = [row[positions[col]] if positions[col] < len(row) else None for col in columns]
+            if all(value is None for value in values):
+                continue
+            chunk.append(values)
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        if chunk or not columns:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+def clean_attendance(df):
+    """Converts raw export columns to the dashboard's typed representation."""
+    # Data cleaning and type conversion
+    if 'วันที่' in df.columns:
+        df['วันที่'] = pd.to_datetime(df['วันที่'], errors='coerce')
+    for col in ['เข้างาน', 'ออกงาน']:
+        if col in df.columns:
+            df[col] = parse_clock_minutes(df[col])
+
+    for col in ["ชื่อ-สกุล", "แผนก", "ข้อยกเว้น"]:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.strip().str.replace(r"\s+", " ", regex=True).replace({"nan": None, "": None})
+    if 'ชื่อ-สกุล' in df.columns:
+        # Derived from the cleaned name, so "A B" and "A  B" are the same employee.
+        df[NAME_KEY] = df['ชื่อ-สกุล'].fillna("").str.lower()
+    if "แผนก" in df.columns:
+        df["แผนก"] = df["แผนก"].fillna("ไม่ระบุ")
+    if "ข้อยกเว้น" in df.columns:
+        df = classify_exceptions(df)
+    return df
+
+def read_source_file(file_path):
+    """Parses an Excel or CSV attendance export into a typed DataFrame.
+
+    The file is read in chunks of READ_CHUNK_ROWS rows and only USED_COLUMNS are
+    kept, so peak memory is bounded by one raw chunk plus the typed result.
+    """
+    file_extension = os.path.splitext(file_path)[1].lower()
+    if file_extension in ['.xlsx', '.xls']:
+        chunks = iter_excel_chunks(file_path)
+    elif file_extension == '.csv':
+        chunks = pd.read_csv(file_path, usecols=lambda col: col in USED_COLUMNS, chunksize=READ_CHUNK_ROWS)
+    else:
+        raise ValueError(f"Unsupported file format: {file_extension}")
+
+    frames = [clean_attendance(chunk) for chunk in chunks]
+    if not frames:
         return pd.DataFrame()
+    # Group each employee's rows together so lookups are a contiguous slice.
+    return combine_partitions(frames)
 
-def process_user_data(df, user_name):
-    """Processes attendance data for a specific user."""
-    if df.empty or "ชื่อ-สกุล" not in df.columns:
-        return pd.DataFrame(), pd.DataFrame()
+@dataclass
+class AttendanceData:
+    """Cleaned attendance rows plus lookup structures built once per data version."""
+    df: "pd.DataFrame" = field(default_factory=lambda: pd.DataFrame())
+    employee_rows: dict = field(default_factory=dict)
+    summary: "pd.DataFrame" = field(default_factory=lambda: pd.DataFrame())
+    cube: "pd.DataFrame" = field(default_factory=lambda: pd.DataFrame())
+    monthly: "pd.DataFrame" = field(default_factory=lambda: pd.DataFrame())
+    start_date: object = None
+    end_date: object = None
+
+def index_employee_rows(df):
+    """Maps each normalized name to the slice of its rows in a name-sorted DataFrame."""
+    # Compare neighbours on the column itself. With pandas 3 (pinned in
+    # requirements.txt) names use the Arrow-backed str dtype and stay in the
+    # shared buffers; converting them to a NumPy array would copy every name.
+    names = df[NAME_KEY]
+    starts = np.flatnonzero(names.ne(names.shift()).to_numpy())
+    stops = np.r_[starts[1:], len(names)]
+    rows = {name: slice(int(start), int(stop)) for name, start, stop in zip(names.iloc[starts], starts, stops)}
+    # Rows with a blank name (key "") belong to no employee.
+    rows.pop("", None)
+    return rows
+
+def build_employee_monthly(df):
+    """Sums leave counts by employee and month, leaving out rows with a blank name."""
+    monthly = build_monthly_totals(df, NAME_KEY)
+    return monthly[monthly.index.get_level_values(0) != ""]
+
+def build_monthly_totals(df, by):
+    """Sums leave counts by a key column and month, e.g. the department cube for the org dashboard.
+
+    Every key and month with any rows gets a cell, even one without exceptions,
+    so this needs all rows; the materialized tables store the result.
+    """
+    if df.empty or not {by, "วันที่"}.issubset(df.columns):
+        return pd.DataFrame(columns=LEAVE_TYPES)
+    month = df["วันที่"].dt.to_period("M").dt.to_timestamp().rename("เดือน")
+    return df.groupby([df[by], month])[LEAVE_TYPES].sum().astype("float64")
+
+def build_attendance_data(df):
+    """Indexes a cleaned DataFrame by normalized employee name."""
+    data = AttendanceData(df=df)
+    if df.empty:
+        return data
+    if NAME_KEY in df.columns:
+        data.employee_rows = index_employee_rows(df)
+        if all(leave_type in df.columns for leave_type in LEAVE_TYPES):
+            grouped = df.groupby(NAME_KEY, sort=False)
+            data.summary = grouped[LEAVE_TYPES].sum()
+            data.summary.insert(0, "ชื่อ-สกุล", grouped["ชื่อ-สกุล"].first())
+            if "แผนก" in df.columns:
+                # An employee who moved counts under their latest department.
+                data.summary.insert(1, "แผนก", grouped["แผนก"].last())
+            # Rows with a blank name still count towards their department, not as an employee.
+            data.summary = data.summary.drop("", errors="ignore")
+            data.cube = build_monthly_totals(df, "แผนก")
+            data.monthly = build_employee_monthly(df)
+    if 'วันที่' in df.columns and df['วันที่'].notna().any():
+        data.start_date, data.end_date = df['วันที่'].min(), df['วันที่'].max()
+    return data
+
+def list_partitions(path):
+    """Returns the source files behind a data path: the file itself or a directory's exports."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(SOURCE_EXTENSIONS) and not name.startswith(("~$", "."))
+        )
+    return [path] if os.path.exists(path) else []
+
+def data_version(path):
+    """Returns a cache bust key that changes whenever any source file or the materialized tables change."""
+    paths = list_partitions(path) + [materialized_file(MATERIALIZED_PATH, "manifest.json")]
+    return tuple((p, os.path.getmtime(p), os.path.getsize(p)) for p in paths if os.path.exists(p))
+
+@st.cache_resource
+def get_digest_cache():
+    """Returns the process-wide map of source file -> (stat key, content digest)."""
+    return {}
+
+def source_digest(file_path):
+    """Returns a source file's content hash, re-hashing only when its mtime or size changes."""
+    digests = get_digest_cache()
+    stat = os.stat(file_path)
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    cached = digests.get(file_path)
+    if cached and cached[0] == stat_key:
+        return cached[1]
+    digest = file_digest(file_path)
+    digests[file_path] = (stat_key, digest)
+    return digest
+
+def load_partition(file_path, digest):
+    """Returns one source file's cleaned rows, parsing it only when its contents change."""
+    return load_cached(sidecar_path(file_path, digest), digest, lambda: read_source_file(file_path))
 
-    normalized_user_name = user_name.strip().lower()
-    df["ชื่อ-สกุล_normalized"] = df["ชื่อ-สกุล"].astype(str).str.strip().str.lower()
+def combine_partitions(frames):
+    """Concatenates cleaned chunks or partitions and restores the per-employee row order."""
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    if 'ข้อยกเว้น' in df.columns and len(frames) > 1:
+        # Each frame has its own category set, which concat turns into objects.
+        df['ข้อยกเว้น'] = df['ข้อยกเว้น'].astype('category')
+    if NAME_KEY in df.columns:
+        sort_by = [NAME_KEY, 'วันที่'] if 'วันที่' in df.columns else [NAME_KEY]
+        df = df.sort_values(sort_by, kind="stable").reset_index(drop=True)
+    return df
+
+def data_digest(paths):
+    """Returns the content hash of a data path's source files (combined for a directory)."""
+    digests = [source_digest(path) for path in paths]
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.sha256("".join(digests).encode()).hexdigest()
+
+def materialized_file(output_dir, name):
+    """Returns the path of one materialized table or its manifest."""
+    return os.path.join(output_dir, name)
+
+def write_materialized(data, output_dir, digest):
+    """Writes per-employee totals and exception rows, then the manifest that publishes them.
+
+    events.arrow keeps only rows with an exception, sorted by employee and date,
+    so each leave type's date list is a filter over a few rows per employee. The
+    department and employee monthly totals are stored as built from all rows:
+    rebuilt from events alone, they would lose months without exceptions.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    events = data.df[data.df[LEAVE_TYPES].gt(0).any(axis=1)].reset_index(drop=True)
+    tables = {
+        "summary.arrow": pa.Table.from_pandas(data.summary.reset_index(), preserve_index=False),
+        "events.arrow": pa.Table.from_pandas(events, preserve_index=False),
+        "cube.arrow": pa.Table.from_pandas(data.cube.reset_index(), preserve_index=False),
+        "monthly.arrow": pa.Table.from_pandas(data.monthly.reset_index(), preserve_index=False),
+    }
+    for name, table in tables.items():
+        path = materialized_file(output_dir, name)
+        feather.write_feather(table, f"{path}.tmp", compression="uncompressed")
+        os.replace(f"{path}.tmp", path)
+    manifest = {
+        "version": MATERIALIZED_VERSION,
+        "source_digest": digest,
+        "start_date": data.start_date.isoformat() if data.start_date is not None else None,
+        "end_date": data.end_date.isoformat() if data.end_date is not None else None,
+        "employees": len(data.summary),
+        "events": len(events),
+        "generated_at": datetime.datetime.now(bangkok_tz).isoformat(),
+    }
+    path = materialized_file(output_dir, "manifest.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    # The manifest goes last: readers only trust tables it vouches for.
+    os.replace(f"{path}.tmp", path)
+    return manifest
+
+def read_monthly_table(table, by):
+    """Restores a materialized table of monthly totals to build_monthly_totals' shape."""
+    monthly = table.to_pandas()
+    if monthly.empty:
+        return pd.DataFrame(columns=LEAVE_TYPES)
+    return monthly.set_index([by, "เดือน"])
+
+def read_materialized(output_dir, digest):
+    """Returns AttendanceData from the materialized tables, or None if they are missing or stale."""
+    try:
+        with open(materialized_file(output_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MATERIALIZED_VERSION or manifest.get("source_digest") != digest:
+            return None
+        tables = {
+            name: feather.read_table(materialized_file(output_dir, f"{name}.arrow"), memory_map=True)
+            for name in ("summary", "events", "cube", "monthly")
+        }
+    except (OSError, ValueError, pa.ArrowInvalid):
+        return None
+    df = tables["events"].to_pandas(split_blocks=True)
+    return AttendanceData(
+        df=df,
+        employee_rows=index_employee_rows(df) if not df.empty else {},
+        summary=tables["summary"].to_pandas().set_index(NAME_KEY),
+        cube=read_monthly_table(tables["cube"], "แผนก"),
+        monthly=read_monthly_table(tables["monthly"], NAME_KEY),
+        start_date=pd.Timestamp(manifest["start_date"]) if manifest["start_date"] else None,
+        end_date=pd.Timestamp(manifest["end_date"]) if manifest["end_date"] else None,
+    )
+
+def read_attendance(file_path, materialized_dir=MATERIALIZED_PATH):
+    """Loads a data path into indexed AttendanceData, raising if it cannot be read.
+
+    Current materialized tables in materialized_dir are used when available. Otherwise each file is
+    parsed only when its contents change and its rows are memory-mapped from its
+    Arrow sidecar; a directory's combined rows get a sidecar of their own, keyed
+    by all partition digests.
+    """
+    paths = list_partitions(file_path)
+    if not paths:
+        raise FileNotFoundError(f"Data file not found: {file_path}")
+    digest = data_digest(paths)
+    if materialized_dir:
+        data = read_materialized(materialized_dir, digest)
+        if data is not None:
+            return data
+    if len(paths) == 1:
+        df = load_partition(paths[0], digest)
+    else:
+        df = load_cached(
+            sidecar_path(file_path, digest),
+            digest,
+            lambda: combine_partitions([load_partition(p, source_digest(p)) for p in paths]),
+        )
+    return build_attendance_data(df)
+
+@st.cache_resource(ttl=600)
+@timed("load_data")
+def load_data(file_path=DATA_PATH, file_mod_time=None):
+    """Loads data from an Excel/CSV file or a directory of them and returns it as indexed AttendanceData.
     
-    df_user = df[df["ชื่อ-สกุล_normalized"] == normalized_user_name].copy()
-    if df_user.empty:
+    The 'file_mod_time' argument is a cache bust key to reload data when the files
+    or the materialized tables change (see data_version).
+    The result is shared between sessions and must be treated as read-only.
+    """
+    if not list_partitions(file_path):
+        st.warning(f"❌ Data file not found: {file_path}")
+        return AttendanceData()
+
+    try:
+        return read_attendance(file_path)
+    except Exception as e:
+        st.error(f"Error reading file: {e}")
+        return AttendanceData()
+
+@timed("process_user_data")
+def process_user_data(data, user_name):
+    """Returns a user's attendance rows and their precomputed leave summary."""
+    key = normalize_name(user_name)
+    if data.summary.empty or key not in data.summary.index:
         return pd.DataFrame(), pd.DataFrame()
 
-    for col in ["ชื่อ-สกุล", "แผนก", "ข้อยกเว้น"]:
-        if col in df_user.columns:
-            df_user[col] = df_user[col].astype(str).str.strip().str.replace(r"\s+", " ", regex=True)
-    if "แผนก" in df_user.columns:
-        df_user["แผนก"] = df_user["แผนก"].replace({"nan": "ไม่ระบุ", "": "ไม่ระบุ"})
-    
-    def leave_days(exception_text):
-        return 0.5 if "ครึ่งวัน" in str(exception_text) else 1
-
-    df_user["ลาป่วย/ลากิจ"] = df_user["ข้อยกเว้น"].apply(
-        lambda x: leave_days(x) if str(x) in ["ลาป่วย", "ลากิจ", "ลาป่วยครึ่งวัน", "ลากิจครึ่งวัน"] else 0)
-    df_user["ขาด"] = df_user["ข้อยกเว้น"].apply(
-        lambda x: leave_days(x) if str(x) in ["ขาด", "ขาดครึ่งวัน"] else 0)
-    df_user["สาย"] = df_user["ข้อยกเว้น"].apply(lambda x: 1 if str(x) == "สาย" else 0)
-    df_user["พักผ่อน"] = df_user["ข้อยกเว้น"].apply(lambda x: 1 if str(x) == "พักผ่อน" else 0)
-
-    leave_types = ["ลาป่วย/ลากิจ", "ขาด", "สาย", "พักผ่อน"]
-    summary_df = df_user.groupby("ชื่อ-สกุล")[leave_types].sum().reset_index()
+    # Materialized data only has exception rows, so an employee may have none.
+    df_user = data.df.iloc[data.employee_rows.get(key, slice(0, 0))]
+    summary_df = data.summary.loc[[key]].reset_index(drop=True)
     return df_user, summary_df
 
+def slice_date_range(df_user, start, end):
+    """Returns a user's rows dated in [start, end) by binary search over their sorted dates."""
+    # Each employee's rows are stored in date order, see combine_partitions.
+    lo, hi = df_user["วันที่"].searchsorted([start, end])
+    return df_user.iloc[lo:hi]
+
+def summarize_rows(df_user, name):
+    """Totals a user's leave counts over the given rows, in the same shape as process_user_data."""
+    return pd.DataFrame({"ชื่อ-สกุล": [name], **{t: [df_user[t].sum()] for t in LEAVE_TYPES}})
+
 # -----------------------------
-# Firebase Integration
+# Storage Backends (users and sessions)
 # -----------------------------
-if not firebase_admin._apps:
+# Select the backend with HR_DASHBOARD_STORAGE: "firestore" (default) needs the
+# `firebase` secrets; "sqlite" keeps everything in a local database file.
+STORAGE_BACKEND = os.environ.get("HR_DASHBOARD_STORAGE", "firestore")
+SQLITE_PATH = os.environ.get("HR_DASHBOARD_SQLITE_PATH", "hr_dashboard.db")
+
+class StorageBackend(abc.ABC):
+    """Persistence for user documents and login sessions."""
+
+    @abc.abstractmethod
+    def get_user(self, phone):
+        """Returns the user document for a phone number, or None."""
+
+    @abc.abstractmethod
+    def save_user(self, phone, user_data):
+        """Creates or replaces the user document for a phone number."""
+
+    @abc.abstractmethod
+    def update_password(self, phone, password_hash):
+        """Sets only the password field of an existing user document."""
+
+    @abc.abstractmethod
+    def create_session(self, session_id, user_phone, expires_at):
+        """Stores a new session for a phone number, valid until expires_at."""
+
+    @abc.abstractmethod
+    def get_session(self, session_id):
+        """Returns {"user_phone", "expires_at"} with a UTC-aware expires_at, or None."""
+
+    @abc.abstractmethod
+    def delete_session(self, session_id):
+        """Deletes a session if it exists."""
+
+    @abc.abstractmethod
+    def delete_expired_sessions(self, now_utc, batch_size):
+        """Deletes up to batch_size sessions that expired before now_utc and returns the count."""
+
+class FirestoreBackend(StorageBackend):
+    """Stores users and sessions in the Firestore `users` and `sessions` collections."""
+
+    def __init__(self):
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
+        if not firebase_admin._apps:
+            service_account_info = st.secrets["firebase"]
+            firebase_config_dict = dict(service_account_info)
+            cred = credentials.Certificate(firebase_config_dict)
+            firebase_admin.initialize_app(cred)
+        self.firestore = firestore
+        self.db = firestore.client()
+
+    def get_user(self, phone):
+        doc = self.db.collection("users").document(phone).get()
+        return doc.to_dict() if doc.exists else None
+
+    def save_user(self, phone, user_data):
+        self.db.collection("users").document(phone).set(user_data)
+
+    def update_password(self, phone, password_hash):
+        self.db.collection("users").document(phone).update({"password": password_hash})
+
+    def create_session(self, session_id, user_phone, expires_at):
+        self.db.collection("sessions").document(session_id).set({
+            "user_phone": user_phone,
+            "created_at": self.firestore.SERVER_TIMESTAMP,
+            "expires_at": expires_at
+        })
+
+    def get_session(self, session_id):
+        session_doc = self.db.collection("sessions").document(session_id).get()
+        if not session_doc.exists:
+            return None
+        session_data = session_doc.to_dict()
+        expires_at = session_data.get("expires_at")
+
+        # Firestore returns a datetime object. We need to ensure it's timezone-aware for comparison.
+        if isinstance(expires_at, datetime.datetime) and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=pytz.utc)
+        return {"user_phone": session_data.get("user_phone"), "expires_at": expires_at}
+
+    def delete_session(self, session_id):
+        self.db.collection("sessions").document(session_id).delete()
+
+    def delete_expired_sessions(self, now_utc, batch_size):
+        expired = list(
+            self.db.collection("sessions")
+            .where(filter=self.firestore.FieldFilter("expires_at", "<", now_utc))
+            .limit(batch_size)
+            .stream()
+        )
+        if expired:
+            batch = self.db.batch()
+            for doc in expired:
+                batch.delete(doc.reference)
+            batch.commit()
+        return len(expired)
+
+class SQLiteBackend(StorageBackend):
+    """Stores users and sessions in a local SQLite database.
+
+    A single connection in WAL mode is shared by all script threads and
+    serialized with a lock.
+    """
+
+    def __init__(self, path=SQLITE_PATH):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS users (
+                    phone TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    user_phone TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS sessions_user_phone ON sessions (user_phone);
+                CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at);
+            """)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def get_user(self, phone):
+        rows = self._execute("SELECT data FROM users WHERE phone = ?", (phone,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_user(self, phone, user_data):
+        self._execute(
+            "INSERT INTO users (phone, data) VALUES (?, ?) "
+            "ON CONFLICT (phone) DO UPDATE SET data = excluded.data",
+            (phone, json.dumps(user_data, ensure_ascii=False)),
+        )
+
+    def update_password(self, phone, password_hash):
+        self._execute("UPDATE users SET data = json_set(data, '$.password', ?) WHERE phone = ?", (password_hash, phone))
+
+    def create_session(self, session_id, user_phone, expires_at):
+        self._execute(
+            "INSERT INTO sessions (session_id, user_phone, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (session_id, user_phone, time.time(), expires_at.timestamp()),
+        )
+
+    def get_session(self, session_id):
+        rows = self._execute("SELECT user_phone, expires_at FROM sessions WHERE session_id = ?", (session_id,))
+        if not rows:
+            return None
+        user_phone, expires_at = rows[0]
+        return {"user_phone": user_phone, "expires_at": datetime.datetime.fromtimestamp(expires_at, pytz.utc)}
+
+    def delete_session(self, session_id):
+        self._execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def delete_expired_sessions(self, now_utc, batch_size):
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM sessions WHERE session_id IN "
+                "(SELECT session_id FROM sessions WHERE expires_at < ? LIMIT ?)",
+                (now_utc.timestamp(), batch_size),
+            )
+            return cursor.rowcount
+
+class InstrumentedStorage(StorageBackend):
+    """Counts a backend's reads and writes and times each call."""
+
+    def __init__(self, backend, name, metrics):
+        self.backend = backend
+        self.name = name
+        self.metrics = metrics
+
+    def _call(self, operation, kind, *args):
+        self.metrics.inc(f"storage_{kind}_total", backend=self.name, operation=operation)
+        with self.metrics.span(f"storage.{operation}"):
+            return getattr(self.backend, operation)(*args)
+
+    def get_user(self, phone):
+        return self._call("get_user", "reads", phone)
+
+    def save_user(self, phone, user_data):
+        return self._call("save_user", "writes", phone, user_data)
+
+    def update_password(self, phone, password_hash):
+        return self._call("update_password", "writes", phone, password_hash)
+
+    def create_session(self, session_id, user_phone, expires_at):
+        return self._call("create_session", "writes", session_id, user_phone, expires_at)
+
+    def get_session(self, session_id):
+        return self._call("get_session", "reads", session_id)
+
+    def delete_session(self, session_id):
+        return self._call("delete_session", "writes", session_id)
+
+    def delete_expired_sessions(self, now_utc, batch_size):
+        return self._call("delete_expired_sessions", "writes", now_utc, batch_size)
+
+@st.cache_resource
+def get_storage():
+    """Returns the process-wide storage backend chosen by HR_DASHBOARD_STORAGE."""
+    if STORAGE_BACKEND == "sqlite":
+        backend = SQLiteBackend(SQLITE_PATH)
+    elif STORAGE_BACKEND == "firestore":
+        backend = FirestoreBackend()
+    else:
+        raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+    return InstrumentedStorage(backend, STORAGE_BACKEND, get_metrics())
+
+def connect_storage():
+    """Opens the storage backend, stopping the script with an error if it is unavailable."""
     try:
-        service_account_info = st.secrets["firebase"]
-        firebase_config_dict = dict(service_account_info)
-        cred = credentials.Certificate(firebase_config_dict)
-        firebase_admin.initialize_app(cred)
+        get_storage()
     except Exception as e:
-        st.error(f"เกิดข้อผิดพลาดในการเชื่อมต่อ Firebase: {e}")
-        st.info("กรุณาตรวจสอบว่าคุณได้ตั้งค่า `secrets` บน Streamlit Cloud อย่างถูกต้อง")
+        if STORAGE_BACKEND == "firestore":
+            st.error(f"เกิดข้อผิดพลาดในการเชื่อมต่อ Firebase: {e}")
+            st.info("กรุณาตรวจสอบว่าคุณได้ตั้งค่า `secrets` บน Streamlit Cloud อย่างถูกต้อง")
+        else:
+            st.error(f"เกิดข้อผิดพลาดในการเปิดฐานข้อมูล: {e}")
         st.stop()
 
-@st.cache_data(ttl=600)
-def load_user_db():
+class TTLCache:
+    """A thread-safe LRU cache whose entries expire after a time-to-live in seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value for key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        """Stores a value, evicting the least recently used entry when full."""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        """Removes a single entry if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 600
+
+class UserRepository:
+    """Fetches user documents by phone number, caching them in a bounded LRU."""
+
+    def __init__(self, storage, maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.storage = storage
+        self.cache = TTLCache(maxsize, ttl)
+
+    def get(self, phone):
+        """Returns a copy of the user document, or None if the phone is not registered."""
+        if not phone:
+            return None
+        user_data = self.cache.get(phone)
+        if user_data is None:
+            user_data = self.storage.get_user(phone)
+            if user_data is None:
+                return None
+            self.cache.set(phone, user_data)
+        return dict(user_data)
+
+    def save(self, phone, user_data):
+        """Writes a user document and drops only that user's cache entry."""
+        self.storage.save_user(phone, user_data)
+        self.cache.pop(phone)
+
+    def update_password(self, phone, password_hash):
+        """Writes only a user's password field and drops that user's cache entry."""
+        self.storage.update_password(phone, password_hash)
+        self.cache.pop(phone)
+
+@st.cache_resource
+def get_user_repository():
+    """Returns the process-wide user repository."""
+    repository = UserRepository(get_storage())
+    get_metrics().add_collector(lambda: {
+        ("cache_hits_total", (("cache", "users"),)): repository.cache.hits,
+        ("cache_misses_total", (("cache", "users"),)): repository.cache.misses,
+    })
+    return repository
+
+@timed("get_user")
+def get_user(phone):
+    """Returns the user document for a phone number, or None if it does not exist."""
     try:
-        db = firestore.client()
-        users_ref = db.collection("users")
-        users_dict = {doc.id: doc.to_dict() for doc in users_ref.stream()}
-        return users_dict
+        return get_user_repository().get(phone)
     except Exception as e:
-        st.error(f"Error loading user database from Firestore: {e}")
-        return {}
+        st.error(f"Error loading user: {e}")
+        return None
 
 def save_user_db(phone, user_data):
     try:
-        db = firestore.client()
-        db.collection("users").document(phone).set(user_data)
-        st.cache_data.clear()
+        get_user_repository().save(phone, user_data)
     except Exception as e:
-        st.error(f"Error saving user data to Firestore: {e}")
+        st.error(f"Error saving user data: {e}")
+
+def save_password_db(phone, password_hash):
+    """Writes only a user's password field, so a cached document can't overwrite newer fields.
+
+    Returns True on success.
+    """
+    try:
+        get_user_repository().update_password(phone, password_hash)
+        return True
+    except Exception as e:
+        st.error(f"Error saving password: {e}")
+        return False
+
+SESSION_LIFETIME = datetime.timedelta(days=7)
+SESSION_CACHE_SIZE = 4096
+# Logout deletes the session from storage but evicts it only from this process's
+# cache, so with several replicas a logged-out session stays valid on the others
+# for up to SESSION_CACHE_TTL seconds.
+SESSION_CACHE_TTL = 300
+SESSION_SWEEP_INTERVAL = 3600
+SESSION_SWEEP_BATCH = 500
 
+class SessionCache:
+    """Caches validated sessions in process and sweeps expired sessions from storage."""
+
+    def __init__(self, storage, maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL):
+        self.storage = storage
+        self.cache = TTLCache(maxsize, ttl)
+        self.sweeps = 0
+        self.swept = 0
+
+    def get(self, session_id):
+        """Returns the phone number of a cached, unexpired session, or None."""
+        return self.cache.get(session_id)
+
+    def put(self, session_id, user_phone, expires_at):
+        """Caches a validated session without outliving its expires_at."""
+        remaining = (expires_at - datetime.datetime.now(pytz.utc)).total_seconds()
+        if remaining > 0:
+            self.cache.set(session_id, user_phone, ttl=min(self.cache.ttl, remaining))
+
+    def forget(self, session_id):
+        self.cache.pop(session_id)
+
+    def sweep(self, batch_size=SESSION_SWEEP_BATCH):
+        """Deletes expired sessions in batched writes and returns how many were removed."""
+        now_utc = datetime.datetime.now(pytz.utc)
+        deleted = 0
+        while True:
+            count = self.storage.delete_expired_sessions(now_utc, batch_size)
+            deleted += count
+            if count < batch_size:
+                break
+        self.sweeps += 1
+        self.swept += deleted
+        return deleted
+
+    def start_sweeper(self, interval=SESSION_SWEEP_INTERVAL):
+        """Runs sweep() every `interval` seconds on a daemon thread."""
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception:
+                    logger.exception("Session sweep failed")
+                time.sleep(interval)
+        threading.Thread(target=run, name="session-sweeper", daemon=True).start()
+
+@st.cache_resource
+def get_session_cache():
+    """Returns the process-wide session cache, starting its sweeper on first use."""
+    sessions = SessionCache(get_storage())
+    sessions.start_sweeper()
+    get_metrics().add_collector(lambda: {
+        ("cache_hits_total", (("cache", "sessions"),)): sessions.cache.hits,
+        ("cache_misses_total", (("cache", "sessions"),)): sessions.cache.misses,
+        ("session_sweeps_total", ()): sessions.sweeps,
+        ("sessions_swept_total", ()): sessions.swept,
+    })
+    return sessions
+
+@timed("create_session")
 def create_session(user_phone):
-    """Creates a new session in Firestore and returns its ID."""
-    db = firestore.client()
+    """Creates a new session and returns its ID."""
     session_id = str(uuid.uuid4())
-    session_ref = db.collection("sessions").document(session_id)
     
     # Set expiration for 7 days from now
     now_utc = datetime.datetime.now(pytz.utc)
-    expires_at = now_utc + datetime.timedelta(days=7)
+    expires_at = now_utc + SESSION_LIFETIME
     
-    session_ref.set({
-        "user_phone": user_phone,
-        "created_at": firestore.SERVER_TIMESTAMP,
-        "expires_at": expires_at
-    })
+    get_storage().create_session(session_id, user_phone, expires_at)
+    get_session_cache().put(session_id, user_phone, expires_at)
     return session_id
 
 def delete_session(session_id):
-    """Deletes the current session from Firestore."""
+    """Deletes the current session from storage and this process's session cache."""
     if session_id:
+        get_session_cache().forget(session_id)
         try:
-            db = firestore.client()
-            db.collection("sessions").document(session_id).delete()
+            get_storage().delete_session(session_id)
         except Exception as e:
             st.warning(f"Could not delete session {session_id}: {e}")
 
 
+@timed("check_session")
 def check_session(session_id):
-    """Checks for a valid session in Firestore and validates its expiration."""
+    """Checks for a valid session and validates its expiration.
+
+    Validated sessions are served from the in-process cache; storage is only
+    read on a cache miss.
+    """
     if not session_id:
         return None
-    db = firestore.client()
-    session_ref = db.collection("sessions").document(session_id)
-    session_doc = session_ref.get()
-
-    if session_doc.exists:
-        session_data = session_doc.to_dict()
-        expires_at = session_data.get("expires_at")
+    sessions = get_session_cache()
+    user_phone = sessions.get(session_id)
 
-        # Firestore returns a datetime object. We need to ensure it's timezone-aware for comparison.
-        if isinstance(expires_at, datetime.datetime) and expires_at.tzinfo is None:
-            expires_at = expires_at.replace(tzinfo=pytz.utc)
+    if user_phone is None:
+        session_data = get_storage().get_session(session_id)
+        if session_data is None:
+            return None
 
+        expires_at = session_data["expires_at"]
         now_utc = datetime.datetime.now(pytz.utc)
 
         if expires_at and expires_at < now_utc:
@@ -202,28 +1226,142 @@ def check_session(session_id):
             delete_session(session_id)
             return None # Signal that the session is invalid/expired
 
-        # If not expired, proceed with user data retrieval
-        if "user_phone" in session_data:
-            user_phone = session_data["user_phone"]
-            USERS_DB = load_user_db()
-            if user_phone in USERS_DB:
-                user_info = USERS_DB[user_phone].copy()
-                user_info['phone'] = user_phone
-                return user_info
+        user_phone = session_data.get("user_phone")
+        if not user_phone:
+            return None
+        sessions.put(session_id, user_phone, expires_at or now_utc + SESSION_LIFETIME)
+
+    user_info = get_user(user_phone)
+    if user_info:
+        user_info['phone'] = user_phone
+        return user_info
     return None
 
+# -----------------------------
+# Passwords
+# -----------------------------
+# bcrypt runs on a small bounded pool so a burst of logins cannot occupy every
+# script thread at once. Stored hashes with a different cost are upgraded
+# transparently after the next successful login.
+BCRYPT_ROUNDS = int(os.environ.get("HR_DASHBOARD_BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.environ.get("HR_DASHBOARD_PASSWORD_WORKERS", "4"))
+
+@st.cache_resource
+def get_password_pool():
+    """Returns the process-wide bcrypt worker pool."""
+    return ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check_password(password, hashed):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:
+        # Malformed hash in the user document.
+        return False
+
+@timed("bcrypt.hash")
+def hash_password(password):
+    """Hashes a password with the configured cost on the bcrypt pool."""
+    return get_password_pool().submit(_hash_password, password, BCRYPT_ROUNDS).result()
+
+@timed("bcrypt.check")
+def check_password(password, hashed):
+    """Verifies a password against a stored bcrypt hash on the bcrypt pool."""
+    if not hashed:
+        return False
+    return get_password_pool().submit(_check_password, password, hashed).result()
+
+def needs_rehash(hashed):
+    """Returns True if a stored hash was made with a different cost factor."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+def rehash_password_later(phone, password, user_data):
+    """Re-hashes a verified password with the current cost in the background.
+
+    user_data may come from the user cache, so the stored document is re-read
+    and only its password field is written, and only if the password is still
+    the one that was verified. A role change or password reset made meanwhile,
+    e.g. on another replica, is kept.
+    """
+    repository = get_user_repository()
+
+    def rehash():
+        try:
+            password_hash = _hash_password(password, BCRYPT_ROUNDS)
+            current = repository.storage.get_user(phone)
+            if current is None or current.get("password") != user_data.get("password"):
+                return
+            repository.update_password(phone, password_hash)
+        except Exception:
+            logger.exception("Password rehash failed for %s", phone)
+
+    get_password_pool().submit(rehash)
+
+# -----------------------------
+# Browser Session Storage
+# -----------------------------
+session_bridge = components.declare_component(
+    "session_bridge",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "session_bridge"),
+)
+
+SESSION_COOKIE = "hr_session_id"
+SESSION_COOKIE_MAX_AGE = int(SESSION_LIFETIME.total_seconds())
+
+# Removes the session ID from both the cookie and localStorage.
+CLEAR_BROWSER_SESSION_JS = f"""
+    localStorage.removeItem('session_id');
+    window.parent.document.cookie = '{SESSION_COOKIE}=; path=/; max-age=0; SameSite=Lax';
+"""
+
+def persist_session_in_browser(session_id):
+    """Stores the session ID in the browser, clearing the pending flag once the browser confirms."""
+    stored = session_bridge(
+        action="store",
+        session_id=session_id,
+        cookie_name=SESSION_COOKIE,
+        max_age=SESSION_COOKIE_MAX_AGE,
+        key="session_bridge_store",
+        default=None,
+    )
+    if stored == session_id:
+        del st.session_state["pending_session_store"]
+
+def read_session_from_browser():
+    """Returns the session ID saved by the browser, "" if there is none, or None while pending.
+
+    The cookie is sent with the initial request, so it is available in the
+    first script run. Only clients that have the ID in localStorage alone
+    fall back to the bridge component, which also copies it into the cookie.
+    """
+    session_id = st.context.cookies.get(SESSION_COOKIE)
+    if session_id:
+        return session_id
+    return session_bridge(
+        action="read",
+        cookie_name=SESSION_COOKIE,
+        max_age=SESSION_COOKIE_MAX_AGE,
+        key="session_bridge_read",
+        default=None,
+    )
+
 def logout():
     """Initiates the logout process by clearing client-side storage and stopping the script."""
     session_id = st.session_state.get("session_id")
     if session_id:
         delete_session(session_id)
 
-    # This JS will clear the session ID from local storage and reload the page.
+    # This JS will clear the session ID from the browser and reload the page.
     # The Python session state will be naturally cleared upon reload.
     components.html(
-        """
+        f"""
         <script>
-            localStorage.removeItem('session_id');
+            {CLEAR_BROWSER_SESSION_JS}
             window.parent.location.href = window.parent.location.pathname;
         </script>
         """,
@@ -238,9 +1376,9 @@ def logout():
 # UI Display Functions
 # -----------------------------
 
+@timed("display_login_page")
 def display_login_page():
     """Displays the login form."""
-    USERS_DB = load_user_db()
     st.title("⏰ เช็ค ขาด ลา มาสาย")
     st.markdown("กรุณาเข้าสู่ระบบเพื่อดูข้อมูลของคุณ")
     col1, col2, col3 = st.columns([1, 1.5, 1])
@@ -261,28 +1399,24 @@ def display_login_page():
             )
 
             if st.button("✅ เข้าสู่ระบบ", use_container_width=True, type="primary"):
-                if phone in USERS_DB:
-                    user_data = USERS_DB[phone]
+                connect_storage()
+                user_data = get_user(phone)
+                if user_data:
                     if user_data.get("password") in ["null", None, ""]:
                         st.session_state.phone = phone
                         st.session_state.step = "set_password"
                         st.rerun()
-                    elif user_data.get("password") and bcrypt.checkpw(password.encode('utf-8'), user_data.get("password").encode('utf-8')):
+                    elif check_password(password, user_data.get("password")):
+                        if needs_rehash(user_data["password"]):
+                            rehash_password_later(phone, password, user_data)
                         st.session_state.user = user_data["name"]
                         st.session_state.phone = phone
                         session_id = create_session(phone)
                         
-                        # Save session ID to browser's local storage via JS
-                        components.html(f"""
-                            <script>
-                                localStorage.setItem('session_id', '{session_id}');
-                            </script>
-                            """, height=0)
-                        
+                        # The session ID is saved to the browser on the next run, see persist_session_in_browser.
                         st.session_state.session_id = session_id
+                        st.session_state.pending_session_store = session_id
                         st.session_state.step = "dashboard"
-                        st.success("เข้าสู่ระบบสำเร็จ!")
-                        time.sleep(1) # Give JS time to save before rerun
                         st.rerun()
                     else:
                         st.error("รหัสผ่านไม่ถูกต้อง")
@@ -294,9 +1428,9 @@ def display_login_page():
                 st.session_state.step = "forgot_password"
                 st.rerun()
                 
+@timed("display_password_page")
 def display_password_page(mode="set"):
     """Displays the page for setting or changing a password."""
-    USERS_DB = load_user_db()
     title_map = {"set": "ตั้งรหัสผ่านครั้งแรก", "change": "เปลี่ยนรหัสผ่าน"}
     title = title_map.get(mode, "จัดการรหัสผ่าน")
     st.title(f"🔑 {title}")
@@ -314,18 +1448,18 @@ def display_password_page(mode="set"):
             confirm_password = st.text_input("ยืนยันรหัสผ่านใหม่", type="password")
 
             if st.button("💾 บันทึก", use_container_width=True, type="primary"):
-                user_data = USERS_DB[st.session_state.phone]
-                
-                if mode == "change" and not bcrypt.checkpw(current_password.encode('utf-8'), user_data.get("password", "").encode('utf-8')):
+                user_data = get_user(st.session_state.phone)
+
+                # Only a user that exists gets a password written.
+                if user_data is None:
+                    st.error("ไม่พบข้อมูลผู้ใช้ กรุณาลองใหม่อีกครั้ง")
+                elif mode == "change" and not check_password(current_password, user_data.get("password")):
                     st.error("รหัสผ่านปัจจุบันไม่ถูกต้อง")
                 elif not new_password:
                     st.error("รหัสผ่านใหม่ต้องไม่เป็นค่าว่าง")
                 elif new_password != confirm_password:
                     st.error("รหัสผ่านใหม่และการยืนยันไม่ตรงกัน")
-                else:
-                    hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                    user_data["password"] = hashed_password
-                    save_user_db(st.session_state.phone, user_data)
+                elif save_password_db(st.session_state.phone, hash_password(new_password)):
                     st.success("บันทึกรหัสผ่านใหม่เรียบร้อยแล้ว!")
                     if mode == "change":
                         st.session_state.step = "dashboard"
@@ -342,9 +1476,9 @@ def display_password_page(mode="set"):
                     st.session_state.step = "dashboard"
                     st.rerun()
 
+@timed("display_forgot_password_page")
 def display_forgot_password_page():
     """Displays the page for password reset with admin verification."""
-    USERS_DB = load_user_db()
     st.title("🔒 ลืมรหัสผ่าน")
     st.markdown("กรุณาให้ผู้ดูแลระบบช่วยเหลือในการรีเซ็ตรหัสผ่าน")
 
@@ -371,20 +1505,18 @@ def display_forgot_password_page():
             confirm_password = st.text_input("ยืนยันรหัสผ่านใหม่", type="password", key="confirm_new_password")
 
             if st.button("💾 บันทึกรหัสผ่านใหม่", use_container_width=True, type="primary"):
-                if user_phone not in USERS_DB:
+                user_data = get_user(user_phone)
+                admin_data = get_user(admin_phone)
+                if not user_data:
                     st.error("ไม่พบเบอร์โทรศัพท์พนักงานนี้ในระบบ")
-                elif admin_phone not in USERS_DB:
+                elif not admin_data:
                     st.error("ไม่พบเบอร์โทรศัพท์ผู้ดูแลระบบในระบบ")
                 else:
-                    admin_data = USERS_DB[admin_phone]
-                    if not bcrypt.checkpw(admin_password.encode('utf-8'), admin_data.get("password", "").encode('utf-8')):
+                    if not check_password(admin_password, admin_data.get("password")):
                         st.error("รหัสผ่านผู้ดูแลระบบไม่ถูกต้อง")
                     elif not new_password or new_password != confirm_password:
                         st.error("รหัสผ่านใหม่และการยืนยันไม่ตรงกัน หรือเป็นค่าว่าง")
-                    else:
-                        hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                        USERS_DB[user_phone]["password"] = hashed_password
-                        save_user_db(user_phone, USERS_DB[user_phone])
+                    elif save_password_db(user_phone, hash_password(new_password)):
                         st.success("ตั้งรหัสผ่านใหม่สำเร็จแล้ว! กรุณากลับไปหน้าล็อกอิน")
                         st.session_state.step = "login"
                         st.rerun()
@@ -393,6 +1525,128 @@ def display_forgot_password_page():
         st.session_state.step = "login"
         st.rerun()
 
+DATE_LIST_PAGE_SIZE = 100
+LEAVE_TYPE_COLORS = ['#FFC300', '#C70039', '#FF5733', '#33C1FF']
+# User documents may carry role "manager" (own department) or "admin" (all departments).
+ORG_ROLES = ("manager", "admin")
+
+def render_date_list(dates_df, key):
+    """Renders one leave type's dates as a single HTML block, paginated for long histories."""
+    total = len(dates_df)
+    pages = -(-total // DATE_LIST_PAGE_SIZE)
+    page = 1
+    if pages > 1:
+        page = st.number_input("หน้า", min_value=1, max_value=pages, value=1, step=1, key=key)
+        st.caption(f"แสดงรายการที่ {(page - 1) * DATE_LIST_PAGE_SIZE + 1}-{min(page * DATE_LIST_PAGE_SIZE, total)} จาก {total} รายการ")
+    rows = dates_df.iloc[(page - 1) * DATE_LIST_PAGE_SIZE:page * DATE_LIST_PAGE_SIZE]
+
+    no_time = pd.Series(MISSING_TIME, index=rows.index)
+    check_in = format_times(rows["เข้างาน"] if "เข้างาน" in rows.columns else no_time)
+    check_out = format_times(rows["ออกงาน"] if "ออกงาน" in rows.columns else no_time)
+    lines = (
+        '<p style="font-size: 0.9rem; margin: 0;">- <b>' + thai_dates(rows["วันที่"]) + '</b>'
+        + ' <span style="white-space: nowrap;">' + check_in + '-' + check_out + '</span>'
+        + ' (' + rows["ข้อยกเว้น"].astype(str) + ')</p>'
+    )
+    st.markdown("".join(lines), unsafe_allow_html=True)
+
+DATE_RANGE_MODES = ["ทั้งหมด", "เดือน", "ไตรมาส", "ปีงบประมาณ", "กำหนดเอง"]
+
+def period_label(period, mode):
+    """Labels a month, quarter or fiscal-year period in Thai with a Buddhist-era year."""
+    if mode == "เดือน":
+        return f"{period.month:02d}/{period.year + 543}"
+    if mode == "ไตรมาส":
+        return f"ไตรมาส {period.quarter}/{period.year + 543}"
+    # Thai fiscal years run October-September and are named after the year they end in.
+    return f"ปีงบประมาณ {period.year + 543}"
+
+def select_date_range(start_date, end_date):
+    """Shows the date range picker and returns (start, end) with an exclusive end, or None for all dates."""
+    mode = st.radio("ช่วงเวลา", DATE_RANGE_MODES, horizontal=True, key="date_range_mode")
+    if mode == "ทั้งหมด":
+        return None
+    if mode == "กำหนดเอง":
+        picked = st.date_input(
+            "ระหว่างวันที่",
+            value=(start_date.date(), end_date.date()),
+            min_value=start_date.date(),
+            max_value=end_date.date(),
+            format="DD/MM/YYYY",
+            key="date_range_custom",
+        )
+        if len(picked) < 2:
+            # The second date has not been picked yet.
+            return None
+        return pd.Timestamp(picked[0]), pd.Timestamp(picked[1]) + pd.Timedelta(days=1)
+    freq = {"เดือน": "M", "ไตรมาส": "Q", "ปีงบประมาณ": "Y-SEP"}[mode]
+    periods = pd.period_range(start_date, end_date, freq=freq)[::-1]
+    period = st.selectbox(mode, periods, format_func=lambda p: period_label(p, mode), key=f"date_range_{freq}")
+    return period.start_time, (period + 1).start_time
+
+# Chart specs are cached per employee, data version and date range, so reruns
+# from unrelated widgets reuse the same Vega-Lite JSON instead of rebuilding it.
+CHART_CACHE_SIZE = 2048
+
+@st.cache_data(max_entries=CHART_CACHE_SIZE, show_spinner=False)
+def summary_chart_spec(_summary, user_key, version, range_key):
+    """Returns the Vega-Lite spec of a user's leave summary bar chart."""
+    summary_melted = _summary.melt(
+        id_vars=["ชื่อ-สกุล"],
+        value_vars=LEAVE_TYPES,
+        var_name="ประเภท",
+        value_name="จำนวนวัน/ครั้ง"
+    )
+    chart = alt.Chart(summary_melted).mark_bar().encode(
+        x=alt.X('จำนวนวัน/ครั้ง:Q', title='จำนวน (วัน/ครั้ง)'),
+        y=alt.Y('ประเภท:N', title='ประเภท', sort='-x'),
+        color=alt.Color('ประเภท:N', 
+                         scale=alt.Scale(
+                             domain=LEAVE_TYPES,
+                             range=LEAVE_TYPE_COLORS
+                         ),
+                         legend=None),
+        tooltip=['ประเภท', 'จำนวนวัน/ครั้ง']
+    ).properties(title='กราฟเปรียบเทียบข้อมูล')
+    return chart.to_dict()
+
+@st.cache_data(max_entries=CHART_CACHE_SIZE, show_spinner=False)
+def trend_chart_spec(_monthly, user_key, version, start, end):
+    """Returns the Vega-Lite spec of a user's monthly leave counts per type between start and end."""
+    months = pd.date_range(start.to_period("M").to_timestamp(), end - pd.Timedelta(days=1), freq="MS", name="เดือน")
+    if user_key in _monthly.index.get_level_values(0):
+        monthly = _monthly.loc[user_key].reindex(months, fill_value=0)
+    else:
+        monthly = pd.DataFrame(0.0, index=months, columns=LEAVE_TYPES)
+    trend = monthly.reset_index().melt(
+        id_vars=["เดือน"],
+        value_vars=LEAVE_TYPES,
+        var_name="ประเภท",
+        value_name="จำนวนวัน/ครั้ง"
+    )
+    chart = alt.Chart(trend).mark_line(point=True).encode(
+        x=alt.X('yearmonth(เดือน):T', title='เดือน'),
+        y=alt.Y('จำนวนวัน/ครั้ง:Q', title='จำนวน (วัน/ครั้ง)'),
+        color=alt.Color('ประเภท:N', scale=alt.Scale(domain=LEAVE_TYPES, range=LEAVE_TYPE_COLORS)),
+        tooltip=[alt.Tooltip('yearmonth(เดือน):T', title='เดือน'), 'ประเภท', 'จำนวนวัน/ครั้ง']
+    ).properties(title='แนวโน้มรายเดือน')
+    return chart.to_dict()
+
+def render_debug_panel():
+    """Shows this process's span timings and counters (admins only)."""
+    metrics = get_metrics()
+    with st.expander("🛠️ Debug: เวลาและตัวนับ"):
+        spans = metrics.span_rows()
+        if spans:
+            st.dataframe(pd.DataFrame(spans).set_index("span"), use_container_width=True)
+        counters = [
+            {"metric": name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else ""), "value": value}
+            for (name, labels), value in sorted(metrics.counter_values().items())
+        ]
+        if counters:
+            st.dataframe(pd.DataFrame(counters).set_index("metric"), use_container_width=True)
+
+@timed("display_dashboard")
 def display_dashboard():
     """Displays the user's dashboard."""
     
@@ -403,6 +1657,14 @@ def display_dashboard():
         if st.button("🔑 เปลี่ยนรหัสผ่าน"):
             st.session_state.step = "change_password"
             st.rerun()
+
+        role = (get_user(st.session_state.get("phone")) or {}).get("role")
+        if role in ORG_ROLES:
+            if st.button("🏢 ภาพรวมแผนก"):
+                st.session_state.step = "org_dashboard"
+                st.rerun()
+        if role == "admin":
+            render_debug_panel()
         
         st.divider()
         st.button("🚪 ออกจากระบบ", on_click=logout, use_container_width=True)
@@ -410,31 +1672,32 @@ def display_dashboard():
     st.header("📊 แดชบอร์ดสรุปข้อมูล")
     st.subheader(f"**{st.session_state.user}**")
 
-    # Get file modification timestamp to use as a cache bust key
-    file_path = "attendances.xlsx"
-    file_mod_time = None
-    if os.path.exists(file_path):
-        file_mod_time = os.path.getmtime(file_path)
-    
-    df_full = load_data(file_path, file_mod_time)
-
-    if not df_full.empty and 'วันที่' in df_full.columns:
-        df_full_cleaned = df_full.dropna(subset=['วันที่'])
-        if not df_full_cleaned.empty:
-            start_date = df_full_cleaned['วันที่'].min()
-            end_date = df_full_cleaned['วันที่'].max()
-            st.markdown(
-                f'<p style="font-size: 0.8rem; margin: 0;">ข้อมูลระหว่างวันที่: <b>{thai_date(start_date)}</b> ถึง <b>{thai_date(end_date)}</b></p>',
-                unsafe_allow_html=True
-            )
+    # Source file modification times are the cache bust key
+    version = data_version(DATA_PATH)
+    data = load_data(DATA_PATH, version)
+
+    if data.start_date is not None:
+        st.markdown(
+            f'<p style="font-size: 0.8rem; margin: 0;">ข้อมูลระหว่างวันที่: <b>{thai_date(data.start_date)}</b> ถึง <b>{thai_date(data.end_date)}</b></p>',
+            unsafe_allow_html=True
+        )
     st.divider()
 
-    df_user, summary = process_user_data(df_full, st.session_state.user)
+    df_user, summary = process_user_data(data, st.session_state.user)
 
     if summary.empty:
         st.info("ไม่พบข้อมูลการเข้า-ออกงานของคุณ")
         return
 
+    date_range = select_date_range(data.start_date, data.end_date) if data.start_date is not None else None
+    range_key = "all"
+    if date_range is not None:
+        # Slicing the already loaded rows; the cached data is not reloaded or rescanned.
+        df_user = slice_date_range(df_user, *date_range)
+        summary = summarize_rows(df_user, summary["ชื่อ-สกุล"].iloc[0])
+        range_key = f"{date_range[0]:%Y%m%d}_{date_range[1]:%Y%m%d}"
+        st.caption(f"แสดงข้อมูลวันที่ {thai_date(date_range[0])} ถึง {thai_date(date_range[1] - pd.Timedelta(days=1))}")
+
     st.markdown("### 🗓️ สรุปภาพรวม")
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("ลาป่วย/ลากิจ (วัน)", summary["ลาป่วย/ลากิจ"].sum())
@@ -444,119 +1707,330 @@ def display_dashboard():
     st.divider()
 
     st.markdown("### 📈 รายละเอียดและสถิติ")
-    summary_melted = summary.melt(
-        id_vars=["ชื่อ-สกุล"],
-        value_vars=["ลาป่วย/ลากิจ", "ขาด", "สาย", "พักผ่อน"],
-        var_name="ประเภท",
-        value_name="จำนวนวัน/ครั้ง"
-    )
-    chart = alt.Chart(summary_melted).mark_bar().encode(
-        x=alt.X('จำนวนวัน/ครั้ง:Q', title='จำนวน (วัน/ครั้ง)'),
-        y=alt.Y('ประเภท:N', title='ประเภท', sort='-x'),
-        color=alt.Color('ประเภท:N', 
-                         scale=alt.Scale(
-                             domain=['ลาป่วย/ลากิจ', 'ขาด', 'สาย', 'พักผ่อน'],
-                             range=['#FFC300', '#C70039', '#FF5733', '#33C1FF']
-                         ),
-                         legend=None),
-        tooltip=['ประเภท', 'จำนวนวัน/ครั้ง']
-    ).properties(title='กราฟเปรียบเทียบข้อมูล')
-    st.altair_chart(chart, use_container_width=True)
+    user_key = normalize_name(st.session_state.user)
+    st.vega_lite_chart(summary_chart_spec(summary, user_key, version, range_key), use_container_width=True)
+
+    st.markdown("#### 📉 แนวโน้มรายเดือน")
+    start, end = date_range or (data.start_date, data.end_date + pd.Timedelta(days=1))
+    st.vega_lite_chart(trend_chart_spec(data.monthly, user_key, version, start, end), use_container_width=True)
 
     st.markdown("#### 📜 รายการวันที่")
-    leave_types_map = {
-        "ลาป่วย/ลากิจ": ["ลาป่วย", "ลากิจ", "ลาป่วยครึ่งวัน", "ลากิจครึ่งวัน"],
-        "ขาด": ["ขาด", "ขาดครึ่งวัน"],
-        "สาย": ["สาย"],
-        "พักผ่อน": ["พักผ่อน"]
-    }
-    
-    for leave_type, exceptions in leave_types_map.items():
+    for leave_type, exceptions in LEAVE_TYPES_MAP.items():
         dates_df = df_user[df_user["ข้อยกเว้น"].isin(exceptions)]
-        total_days = df_user[leave_type].sum()
+        total_days = summary[leave_type].sum()
         if not dates_df.empty:
             with st.expander(f"ดูวันที่ **{leave_type}** (รวม {total_days} วัน/ครั้ง)"):
-                for _, row in dates_df.sort_values(by="วันที่").iterrows():
-                    check_in_time = format_time(row.get('เข้างาน'))
-                    check_out_time = format_time(row.get('ออกงาน'))
-                    time_display = f' <span style="white-space: nowrap;">{check_in_time}-{check_out_time}</span>'
-                    st.markdown(
-                        f'<p style="font-size: 0.9rem; margin: 0;">- <b>{thai_date(row["วันที่"])}</b>{time_display} ({row["ข้อยกเว้น"]})</p>',
-                        unsafe_allow_html=True
-                    )
+                # Rows are already in date order (see read_source_file).
+                render_date_list(dates_df, key=f"date_page_{leave_type}_{range_key}")
     st.divider()
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
         st.button("🚪 ออกจากระบบ", on_click=logout, use_container_width=True, type="secondary")
 
+def visible_departments(user_data, data):
+    """Returns the departments a user's role may see on the org dashboard (none for employees)."""
+    user_data = user_data or {}
+    role = user_data.get("role")
+    if role == "admin":
+        return sorted(data.cube.index.get_level_values("แผนก").unique()) if not data.cube.empty else []
+    if role == "manager":
+        department = user_data.get("department")
+        key = normalize_name(user_data.get("name", ""))
+        if not department and "แผนก" in data.summary.columns and key in data.summary.index:
+            department = data.summary.at[key, "แผนก"]
+        return [department] if department else []
+    return []
+
+def thai_months(months):
+    """Formats month-start timestamps as MM/YYYY in the Buddhist era."""
+    return months.strftime("%m/") + (months.year + 543).astype(str)
+
+@timed("display_org_dashboard")
+def display_org_dashboard():
+    """Displays leave totals by department and month for managers and admins."""
+
+    with st.sidebar:
+        st.header("เมนู")
+        st.info(f"ยินดีต้อนรับ,\n**{st.session_state.user}**")
+
+        if st.button("📊 แดชบอร์ดของฉัน"):
+            st.session_state.step = "dashboard"
+            st.rerun()
+
+        st.divider()
+        st.button("🚪 ออกจากระบบ", on_click=logout, use_container_width=True)
+
+    st.header("🏢 ภาพรวมแผนก")
+
+    data = load_data(DATA_PATH, data_version(DATA_PATH))
+    user_data = get_user(st.session_state.get("phone"))
+    departments = visible_departments(user_data, data)
+    if (user_data or {}).get("role") == "admin":
+        with st.sidebar:
+            render_debug_panel()
+    if not departments:
+        st.warning("คุณไม่มีสิทธิ์ดูข้อมูลภาพรวมแผนก")
+        return
+
+    if data.start_date is not None:
+        st.markdown(
+            f'<p style="font-size: 0.8rem; margin: 0;">ข้อมูลระหว่างวันที่: <b>{thai_date(data.start_date)}</b> ถึง <b>{thai_date(data.end_date)}</b></p>',
+            unsafe_allow_html=True
+        )
+    st.divider()
+
+    # Everything below is served from the department x month cube built at load time.
+    cube = data.cube[data.cube.index.get_level_values("แผนก").isin(departments)]
+    if cube.empty:
+        st.info("ไม่พบข้อมูลการเข้า-ออกงานของแผนก")
+        return
+
+    by_department = cube.groupby(level="แผนก").sum()
+    totals = by_department.sum()
+    st.markdown("### 🗓️ สรุปภาพรวม")
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("ลาป่วย/ลากิจ (วัน)", totals["ลาป่วย/ลากิจ"])
+    col2.metric("ขาดงาน (วัน)", totals["ขาด"])
+    col3.metric("มาสาย (ครั้ง)", int(totals["สาย"]))
+    col4.metric("วันพักผ่อน (วัน)", int(totals["พักผ่อน"]))
+
+    if len(by_department) > 1:
+        st.markdown("#### สรุปตามแผนก")
+        st.dataframe(by_department, use_container_width=True)
+    st.divider()
+
+    st.markdown("### 📈 รายเดือน")
+    department = st.selectbox("แผนก", by_department.index.tolist()) if len(by_department) > 1 else by_department.index[0]
+    monthly = cube.loc[department]
+    monthly_melted = monthly.reset_index().melt(
+        id_vars=["เดือน"],
+        value_vars=LEAVE_TYPES,
+        var_name="ประเภท",
+        value_name="จำนวนวัน/ครั้ง"
+    )
+    chart = alt.Chart(monthly_melted).mark_bar().encode(
+        x=alt.X('yearmonth(เดือน):O', title='เดือน'),
+        y=alt.Y('จำนวนวัน/ครั้ง:Q', title='จำนวน (วัน/ครั้ง)'),
+        color=alt.Color('ประเภท:N', scale=alt.Scale(domain=LEAVE_TYPES, range=LEAVE_TYPE_COLORS)),
+        tooltip=[alt.Tooltip('yearmonth(เดือน):O', title='เดือน'), 'ประเภท', 'จำนวนวัน/ครั้ง']
+    ).properties(title=f'แผนก {department}')
+    st.altair_chart(chart, use_container_width=True)
+
+    with st.expander(f"ดูตัวเลขรายเดือนของแผนก **{department}**"):
+        st.dataframe(monthly.set_axis(thai_months(monthly.index)), use_container_width=True)
+
+    if "แผนก" in data.summary.columns:
+        with st.expander(f"ดูรายชื่อพนักงานแผนก **{department}**"):
+            employees = data.summary[data.summary["แผนก"] == department]
+            st.dataframe(
+                employees.set_index("ชื่อ-สกุล")[LEAVE_TYPES].sort_values("ขาด", ascending=False),
+                use_container_width=True
+            )
+
 # -----------------------------
 # Main App Logic and Persistent Login
 # -----------------------------
+def run_app():
+    """Runs one pass of the Streamlit app: page setup, login restore and page routing."""
+    setup_page()
 
-# Initialize session state keys if they don't exist to prevent errors
-if "user" not in st.session_state:
-    st.session_state.user = None
-if "step" not in st.session_state:
-    st.session_state.step = "login"
-
-# This block handles automatic login from browser's local storage
-if not st.session_state.user:
-    # Try to get session_id from URL parameters first
-    query_params = st.query_params
-    session_id_from_url = query_params.get("session_id")
-    
-    if session_id_from_url:
-        user_data = check_session(session_id_from_url)
-        if user_data:
-            # If session from URL is valid, log the user in
-            st.session_state.user = user_data["name"]
-            st.session_state.phone = user_data["phone"]
-            st.session_state.session_id = session_id_from_url
-            st.session_state.step = "dashboard"
-            # Clear the query parameter from the URL and rerun
-            st.query_params.clear()
-            st.rerun()
+    # Initialize session state keys if they don't exist to prevent errors
+    if "user" not in st.session_state:
+        st.session_state.user = None
+    if "step" not in st.session_state:
+        st.session_state.step = "login"
+
+    # This block restores a saved login in the same script run, without a page reload.
+    if not st.session_state.user and not st.session_state.get("session_restore_done"):
+        session_id = read_session_from_browser()
+        if session_id is not None:
+            st.session_state.session_restore_done = True
+        if session_id:
+            connect_storage()
+            user_data = check_session(session_id)
+            if user_data:
+                st.session_state.user = user_data["name"]
+                st.session_state.phone = user_data["phone"]
+                st.session_state.session_id = session_id
+                st.session_state.step = "dashboard"
+            else:
+                # The saved session is invalid (e.g., expired), so forget it in the browser.
+                st.session_state.step = "login"
+                components.html(f"<script>{CLEAR_BROWSER_SESSION_JS}</script>", height=0)
+
+    # Finish saving a fresh login's session ID in the browser.
+    if st.session_state.get("pending_session_store"):
+        persist_session_in_browser(st.session_state.pending_session_store)
+
+    # The login form needs no storage until it is submitted, so a cold process
+    # paints it before Firebase starts up.
+    if st.session_state.step != "login":
+        connect_storage()
+
+    # Page Router
+    try:
+        if st.session_state.step == "login":
+            display_login_page()
+        elif st.session_state.step == "set_password":
+            display_password_page(mode="set")
+        elif st.session_state.step == "change_password":
+            display_password_page(mode="change")
+        elif st.session_state.step == "forgot_password":
+            display_forgot_password_page()
+        elif st.session_state.step == "dashboard" and st.session_state.user:
+            display_dashboard()
+        elif st.session_state.step == "org_dashboard" and st.session_state.user:
+            display_org_dashboard()
         else:
-            # If session_id is invalid (e.g., expired), clear it and show login
-            st.query_params.clear()
+            # Fallback to login page if state is inconsistent
             st.session_state.step = "login"
-            # Also clear the client-side storage to prevent reload loops
-            components.html("""
-                <script>
-                    localStorage.removeItem('session_id');
-                </script>
-            """, height=0)
-    else:
-        # If no session in URL, run JS to get it from localStorage and reload the page
-        components.html(
-            """
-            <script>
-                const sessionId = localStorage.getItem('session_id');
-                const url = new URL(window.location.href);
-                // Only reload if a session_id exists and it's not already in the URL
-                if (sessionId && !url.searchParams.has('session_id')) {
-                    url.searchParams.set('session_id', sessionId);
-                    window.location.href = url.href;
-                }
-            </script>
-            """,
-            height=0
-        )
+            display_login_page()
+    finally:
+        export_metrics()
 
 # -----------------------------
-# Page Router
+# Command Line
 # -----------------------------
-if st.session_state.step == "login":
-    display_login_page()
-elif st.session_state.step == "set_password":
-    display_password_page(mode="set")
-elif st.session_state.step == "change_password":
-    display_password_page(mode="change")
-elif st.session_state.step == "forgot_password":
-    display_forgot_password_page()
-elif st.session_state.step == "dashboard" and st.session_state.user:
-    display_dashboard()
-else:
-    # Fallback to login page if state is inconsistent
-    st.session_state.step = "login"
-    display_login_page()
+def run_ingest(source, output):
+    """Parses the attendance source and writes its materialized per-employee tables."""
+    try:
+        data = read_attendance(source, materialized_dir=None)
+        manifest = write_materialized(data, output, data_digest(list_partitions(source)))
+    except Exception as e:
+        logger.error("Ingest failed: %s", e)
+        return 1
+    print(f"Wrote {manifest['employees']} employees and {manifest['events']} exception rows "
+          f"({manifest['start_date']} to {manifest['end_date']}) to {output}")
+    return 0
+
+# Employees per export task; each worker process writes its own report files.
+EXPORT_CHUNK = 100
+CONSOLIDATED_REPORT = "สรุปรวม.xlsx"
+UNSAFE_FILE_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+# The attendance data each export worker attaches to once, see init_export_worker.
+export_data = None
+
+def init_export_worker(source):
+    """Loads the attendance data in an export worker (memory-mapped from the shared cache files)."""
+    global export_data
+    export_data = read_attendance(source)
+
+def report_file_name(index, name):
+    """Returns a filesystem-safe, unique report file name for an employee."""
+    return f"{index:05d}_{UNSAFE_FILE_CHARS.sub('_', name.strip())}.xlsx"
+
+def write_employee_report(path, df_user, summary):
+    """Writes one employee's totals and exception dates to a streamed .xlsx workbook."""
+    workbook = openpyxl.Workbook(write_only=True)
+    totals = workbook.create_sheet("สรุป")
+    totals.append(["ชื่อ-สกุล", *LEAVE_TYPES])
+    totals.append([summary["ชื่อ-สกุล"].iloc[0], *(summary[t].iloc[0].item() for t in LEAVE_TYPES)])
+    dates = workbook.create_sheet("รายการวันที่")
+    dates.append(["วันที่", "ประเภท", "ข้อยกเว้น", "เข้างาน", "ออกงาน"])
+    for leave_type, exceptions in LEAVE_TYPES_MAP.items():
+        rows = df_user[df_user["ข้อยกเว้น"].isin(exceptions)]
+        if rows.empty:
+            continue
+        for values in zip(thai_dates(rows["วันที่"]), rows["ข้อยกเว้น"].astype(str),
+                          format_times(rows["เข้างาน"]), format_times(rows["ออกงาน"])):
+            dates.append([values[0], leave_type, *values[1:]])
+    workbook.save(path)
+
+def export_reports(task):
+    """Writes the reports for one chunk of employees and returns their consolidated rows."""
+    output, employees, date_range = task
+    rows = []
+    for index, key in employees:
+        df_user, summary = process_user_data(export_data, key)
+        if summary.empty:
+            continue
+        name = summary["ชื่อ-สกุล"].iloc[0]
+        department = summary["แผนก"].iloc[0] if "แผนก" in summary.columns else None
+        if date_range is not None:
+            df_user = slice_date_range(df_user, *date_range)
+            summary = summarize_rows(df_user, name)
+        file_name = report_file_name(index, name)
+        write_employee_report(os.path.join(output, file_name), df_user, summary)
+        rows.append([name, department, *(summary[t].iloc[0].item() for t in LEAVE_TYPES), file_name])
+    return rows
+
+def run_export(source, output, workers=None, month=None):
+    """Writes a report per employee plus one consolidated workbook, spreading employees over processes.
+
+    The data is parsed at most once (here, into the shared sidecar); workers
+    attach to the same memory-mapped files and reuse process_user_data.
+    """
+    try:
+        data = read_attendance(source)
+        date_range = None
+        if month:
+            period = pd.Period(month, freq="M")
+            date_range = (period.start_time, (period + 1).start_time)
+    except Exception as e:
+        logger.error("Export failed: %s", e)
+        return 1
+    if data.summary.empty:
+        logger.error("Export failed: no attendance data in %s", source)
+        return 1
+
+    os.makedirs(output, exist_ok=True)
+    # One report per employee: the summary is keyed by the whitespace-collapsed,
+    # lowercased name (rows with a blank name are left out of it), which is also
+    # what process_user_data looks up.
+    employees = list(enumerate(data.summary.index, start=1))
+    tasks = [(output, employees[i:i + EXPORT_CHUNK], date_range) for i in range(0, len(employees), EXPORT_CHUNK)]
+    consolidated = openpyxl.Workbook(write_only=True)
+    sheet = consolidated.create_sheet("สรุปทุกคน")
+    sheet.append(["ชื่อ-สกุล", "แผนก", *LEAVE_TYPES, "ไฟล์"])
+    written = 0
+    error = None
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_export_worker, initargs=(source,)) as pool:
+            # Chunks come back in order and are appended as they finish.
+            for rows in pool.map(export_reports, tasks):
+                for row in rows:
+                    sheet.append(row)
+                written += len(rows)
+                logger.info("Exported %d/%d employees", written, len(employees))
+    except Exception as e:
+        error = e
+    # Saved even after a failure: it lists exactly the reports that were written.
+    consolidated.save(os.path.join(output, CONSOLIDATED_REPORT))
+    if error is not None:
+        logger.error("Export failed after %d/%d employees: %s", written, len(employees), error)
+        return 1
+    # Workers skip employees missing from the data they loaded, e.g. when the
+    # source file was replaced after this process read it.
+    if written != len(employees):
+        logger.error("Export incomplete: wrote %d of %d employee reports", written, len(employees))
+        return 1
+    print(f"Wrote {written} employee reports and {CONSOLIDATED_REPORT} to {output}")
+    return 0
+
+def main(argv=None):
+    """Runs a maintenance command, e.g. `python hr_dashboard.py ingest` from a scheduler."""
+    parser = argparse.ArgumentParser(prog="hr_dashboard.py", description="HR dashboard maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="precompute per-employee summaries for the dashboard")
+    ingest.add_argument("--source", default=DATA_PATH, help="export file or directory (default: HR_DASHBOARD_DATA)")
+    ingest.add_argument("--output", default=MATERIALIZED_PATH, help="output directory (default: HR_DASHBOARD_MATERIALIZED)")
+    export = commands.add_parser("export", help="write an Excel report per employee plus a consolidated workbook")
+    export.add_argument("--source", default=DATA_PATH, help="export file or directory (default: HR_DASHBOARD_DATA)")
+    export.add_argument("--output", default="reports", help="output directory (default: reports)")
+    export.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    export.add_argument("--month", help="limit reports to one month, e.g. 2026-09")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    # Cached helpers warn about the missing script context outside `streamlit run`.
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+    if args.command == "ingest":
+        return run_ingest(args.source, args.output)
+    if args.command == "export":
+        return run_export(args.source, args.output, args.workers, args.month)
+    return 2
+
+if __name__ == "__main__":
+    # `streamlit run` executes this file with a script context; plain `python` runs the CLI.
+    if get_script_run_ctx(suppress_warning=True) is None:
+        sys.exit(main())
+    run_app()